@@ -11,29 +11,38 @@
 # https://github.com/JdeRobot/dl-objectdetector
 #
 
+import threading
 import numpy as np
 import cv2
-from PyQt5 import QtGui
-import rospy
-from sensor_msgs.msg import Image
-from cv_bridge import CvBridge
+from Pipeline import imports, instrumentation, tracing
+
+# ROS is only imported with the stream source
+rospy = imports.lazy('rospy')
+ros_msgs = imports.lazy('sensor_msgs.msg')
+cv_bridge = imports.lazy('cv_bridge')
 
 
 class ROSCamera:
 
     def __init__(self):
-        self.image_sub = rospy.Subscriber("/usb_cam/image_raw", Image, self.callback)
-        self.bridge = CvBridge()
+        self.image_sub = rospy.Subscriber("/usb_cam/image_raw", ros_msgs.Image, self.callback)
+        self.bridge = cv_bridge.CvBridge()
         self.image = None
         self.im_height = None
         self.im_width = None
+        self.new_image = threading.Event()
 
     def callback(self, data):
         self.image = self.bridge.imgmsg_to_cv2(data, "bgr8")
         self.im_height = self.image.shape[0]
         self.im_width = self.image.shape[1]
+        self.new_image.set()
 
-    def read(self):
+    def read(self, timeout=1.0):
+        ''' Waits for a new image from the topic (None if nothing arrives before the timeout). '''
+        if not self.new_image.wait(timeout):
+            return None
+        self.new_image.clear()
         return self.image
 
 
@@ -59,6 +68,14 @@ class Camera:
         self.last_frames_video = False
         self.frame_tag = []
         self.logger_status = False  # logging off by default
+        self.pipeline = None
+        self.buffer_size = None  # unbounded until the pipeline is set
+        self.ring = None  # frames decoded ahead of time (prefetching decoder)
+        self.t_decoder = None
+        self.sink = None  # images written synchronously when there is no output sink
+        self.scheduler = None  # detection after every tracked buffer when there is no scheduler
+        self.keep_native = False  # keeps the last frame at the resolution of the source (ROI detection)
+        self.native_image = None
 
         # image source: stream ROS
         if cam == 'stream':
@@ -113,44 +130,140 @@ class Camera:
         if self.gui_cfg == 'off':
             print('GUI not set')
 
-    def getImage(self):
-        ''' Gets the image from the source and returns it resized and tagged with the frame number. '''
-
-        im = None
+    def readFrame(self):
+        ''' Reads the next raw (BGR) frame from the source. '''
+        frame = None
 
         if self.cam and self.source == 'stream_camera':
-            frame = self.cam.read()
+            frame = self.cam.read()  # waits for the topic, not timed
             if frame is not None:
                 self.im_height = frame.shape[0]
                 self.im_width = frame.shape[1]
-                im = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-                im = self.resizeImage(im)
-                im = np.reshape(im, (self.image_net_size[0], self.image_net_size[1], 3))
-                self.frame_counter += 1
-                self.frame_tag.append(self.frame_counter)
 
         elif self.cam and (self.source == 'local_camera' or self.source == 'local_video' or self.source == 'local_images'):
+            start_time = instrumentation.clock()
             _, frame = self.cam.read()
             if frame is not None:
-                im = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-                im = self.resizeImage(im)
-                im = np.reshape(im, (self.image_net_size[0], self.image_net_size[1], 3))
-                self.frame_counter += 1
-                self.frame_tag.append(self.frame_counter)
+                instrumentation.record('decode', instrumentation.clock() - start_time)
+        return frame
+
+    def getImage(self):
+        ''' Gets the image from the source and returns it resized and tagged with the frame number. '''
+
+        im = None
+
+        if self.ring is not None:  # frames already decoded by the decoder thread
+            if self.source == 'local_video' or self.source == 'local_images':
+                im, _ = self.ring.get()  # wait for the decoder until the end of the file
+            else:
+                im, _ = self.ring.get(timeout=1.0)
+        else:
+            frame = self.readFrame()
+            if frame is not None:
+                with instrumentation.timer('resize'):
+                    im = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+                    if self.keep_native:
+                        self.native_image = im
+                    im = self.resizeImage(im)
+                    im = np.reshape(im, (self.image_net_size[0], self.image_net_size[1], 3))
+
+        if im is not None:
+            self.frame_counter += 1
+            self.frame_tag.append(self.frame_counter)
         return im
 
+    def saveImage(self, im, frame_number, to_bgr=True):
+        ''' Writes an output image (RGB) to images_results, or queues it in the output sink. '''
+        if self.sink is not None:
+            try:
+                self.sink.write(im, frame_number, to_bgr)
+            except IOError as error:  # the workers failed: stop instead of losing every result
+                self.gui.fail(error)
+            return
+        with instrumentation.timer('output_write'):
+            if to_bgr:
+                im = cv2.cvtColor(im, cv2.COLOR_BGR2RGB)
+            cv2.imwrite('./images_results/' + str(frame_number) + '.jpg', im)
+
+    def setImageScale(self):
+        ''' Sets the factors to rescale the boxes from the network size to the original size. '''
+        self.network.image_scale = (float(self.im_width)/self.image_net_size[0], float(self.im_height)/self.image_net_size[1])
+        self.tracker.image_scale = self.network.image_scale
+
     def resizeImage(self, im):
         ''' Resizes the image. '''
         im_resized = np.reshape(im, (self.im_height, self.im_width, 3))
-        self.network.image_scale = (float(self.im_width)/self.image_net_size[0], float(self.im_height)/self.image_net_size[1])
-        self.tracker.image_scale = self.network.image_scale
+        self.setImageScale()
         im_resized = cv2.resize(im_resized, self.image_net_size, cv2.INTER_NEAREST)
         return im_resized
 
+    def decodeInto(self, frame, slot):
+        ''' Resizes a raw frame into a preallocated slot and converts it to RGB in place. '''
+        if frame.shape[0] != self.im_height or frame.shape[1] != self.im_width or self.network.image_scale[0] is None:
+            self.im_height = frame.shape[0]
+            self.im_width = frame.shape[1]
+            self.setImageScale()
+        with instrumentation.timer('resize'):
+            cv2.resize(frame, self.image_net_size, dst=slot)
+            cv2.cvtColor(slot, cv2.COLOR_BGR2RGB, dst=slot)
+
+    def startDecoder(self, ring_size, policy):
+        ''' Starts decoding the frames in a background thread into a ring of preallocated frames. '''
+        from Camera.framering import FrameRing
+        from Camera.threaddecoder import ThreadDecoder
+        shape = (self.image_net_size[1], self.image_net_size[0], 3)
+        self.ring = FrameRing(ring_size, shape, policy)
+        self.t_decoder = ThreadDecoder(self, self.ring)
+        self.t_decoder.setDaemon(True)
+        self.t_decoder.start()
+        print('Decoder started: %d frames of %dx%d px, %s on overflow.' % (ring_size, shape[1], shape[0], policy))
+
+    def getDecoderMetrics(self):
+        ''' Returns the occupancy metrics of the decoder ring (None if not prefetching). '''
+        if self.ring is None:
+            return None
+        return self.ring.getMetrics()
+
+    def setSink(self, sink):
+        ''' Declares the output sink where the images with the results are written. '''
+        self.sink = sink
+
+    def setScheduler(self, scheduler):
+        ''' Declares the scheduler which decides when the network detects again. '''
+        self.scheduler = scheduler
+
+    def shouldDetect(self):
+        ''' Checks if the network has to detect the last buffered frame or if the last detection is kept. '''
+        if self.scheduler is None:
+            return True
+        return self.scheduler.shouldDetect(self.tracker.getLostRatio())
+
     def setGUI(self, gui):
         ''' Declares the GUI object. '''
         self.gui = gui
 
+    def setPipeline(self, pipeline):
+        ''' Declares the pipeline used to wake up the other stages. '''
+        self.pipeline = pipeline
+        self.buffer_size = pipeline.buffer_size
+
+    def notify(self, stage):
+        ''' Wakes up a stage of the pipeline. '''
+        if self.pipeline is not None:
+            self.pipeline.notify(stage)
+
+    def isBufferFull(self):
+        ''' Checks if the buffer of frames waiting for the tracker is full. '''
+        return self.buffer_size is not None and len(self.buffer) >= self.buffer_size
+
+    def isStalled(self):
+        ''' Checks if the camera has to wait for the network or the tracker to make progress. '''
+        return self.im is None or self.isBufferFull()
+
+    def getQueueDepth(self):
+        ''' Returns the number of frames waiting for the tracker. '''
+        return len(self.buffer)
+
     def setNetwork(self, network, t_network):
         ''' Declares the Network object and its corresponding control thread. '''
         self.network = network
@@ -161,7 +274,6 @@ class Camera:
     def setTracker(self, tracker):
         ''' Declares the Tracker object. '''
         self.tracker = tracker
-        self.tracker.network_framework = self.network_framework  # indicates the neural network type to the tracker
         self.tracker.logger_status = self.logger_status
 
     def toggleNetworkAndTracker(self):
@@ -193,21 +305,24 @@ class Camera:
         self.buffer = []  # new buffer, reset buffer
         self.frame_tag = []
         self.tracker.activated = True  # tracker on
+        tracing.instant('Camera.trackerConfiguration', frame=self.network.getProcessedFrame(),
+                        buffered=self.tracker.len_buffer_in)
+        self.notify('tracker')
 
     def update(self):
         ''' Main function: controls the flow of the application. '''
         if self.cam:
-            self.im = self.getImage()
+            if not self.isBufferFull():
+                self.im = self.getImage()
+            else:  # back-pressure: stop reading until the tracker takes the buffer
+                self.im = None
         else:
             raise SystemExit('Camera module not working. Exiting...')
 
         if self.im is not None or len(self.buffer) > 0:
 
             if self.gui_cfg == 'on' and self.im is not None:  # control GUI from camera thread
-                im = QtGui.QImage(self.im, self.im.shape[1], self.im.shape[0],
-                                  QtGui.QImage.Format_RGB888)
-                im_scaled = im.scaled(self.gui.im_label.size())
-                self.gui.im_label.setPixmap(QtGui.QPixmap.fromImage(im_scaled))  # show live images
+                self.gui.showInput(self.im)  # show live images
 
             if self.gui.mode == 'continuous':
 
@@ -216,36 +331,40 @@ class Camera:
                     if self.gui.count == 0:
                         self.network.setInputImage(self.im, self.frame_counter)  # process first frame
                         self.frame_to_process = self.frame_counter
+                        if self.scheduler is not None:
+                            self.scheduler.detected(self.im)
                         self.gui.count += 1
-                    else:
-                        if (self.source == 'local_video' or self.source == 'local_images') and self.im is not None:
-                            self.buffer.append(self.im)  # allows processing last frames in buffer
-                        elif self.source == 'local_camera' or self.source == 'stream_camera':
-                            self.buffer.append(self.im)
+                        self.notify('network')
+                    elif self.im is not None:
+                        self.buffer.append(self.im)  # allows processing last frames in buffer
 
                     processed_frame = self.network.getProcessedFrame()
 
                     if processed_frame == self.frame_to_process and not self.network.getOutputImage()[1]:
                         self.im_net = self.network.getOutputImage()[0]
 
-                    if not self.tracker.activated and not self.network.activated and not self.network.getOutputImage()[1]:  # added check if net output is not zeros
+                    if self.scheduler is not None and self.im is not None:
+                        self.scheduler.observe(self.im)
+
+                    if not self.tracker.activated and not self.network.activated and not self.network.getOutputImage()[1] \
+                            and self.buffer and not self.shouldDetect():  # static scene: keep the last detection
+                        self.trackerConfiguration()
+
+                    elif not self.tracker.activated and not self.network.activated and not self.network.getOutputImage()[1]:  # added check if net output is not zeros
                         self.network.setInputImage(
                             self.buffer[len(self.buffer) - 1], self.frame_counter)  # process last frame in buffer
                         self.frame_to_process = self.frame_counter
+                        if self.scheduler is not None:
+                            self.scheduler.detected(self.buffer[len(self.buffer) - 1])
                         self.network.toggleNetwork()  # network on
+                        self.notify('network')
 
                         if self.gui_cfg == 'on':
                             #  show segmented image
-                            im_net = QtGui.QImage(self.im_net.data, self.im_net.shape[1],
-                                                               self.im_net.shape[0],
-                                                               QtGui.QImage.Format_RGB888)
-                            im_net_scaled = im_net.scaled(self.gui.im_net_label.size())
-                            self.gui.im_combined_label.setPixmap(QtGui.QPixmap.fromImage(im_net_scaled))
-                            self.gui.im_net_label.setPixmap(QtGui.QPixmap.fromImage(im_net_scaled))
+                            self.gui.showNet(self.im_net)
 
                         else:  # gui off, save image
-                            saved_image = cv2.cvtColor(self.im_net, cv2.COLOR_BGR2RGB)
-                            cv2.imwrite('./images_results/' + str(self.frame_counter - self.filename_offset) + '.jpg', saved_image)  # in BGR
+                            self.saveImage(self.im_net, self.frame_counter - self.filename_offset)
 
                         # tracking configuration
                         self.trackerConfiguration()
@@ -255,15 +374,9 @@ class Camera:
                         self.tracker.checkProgress()
                         if im_tracked is not None:
                             if self.gui_cfg == 'on':
-                                im_tracked = QtGui.QImage(im_tracked.data, im_tracked.shape[1],
-                                                            im_tracked.shape[0],
-                                                            QtGui.QImage.Format_RGB888)
-                                im_tracked_scaled = im_tracked.scaled(self.gui.im_tracked_label.size())
-                                self.gui.im_combined_label.setPixmap(QtGui.QPixmap.fromImage(im_tracked_scaled))
-                                self.gui.im_tracked_label.setPixmap(QtGui.QPixmap.fromImage(im_tracked_scaled))
+                                self.gui.showTracked(im_tracked)
                             else:  # gui off, save image
-                                saved_image = cv2.cvtColor(im_tracked, cv2.COLOR_BGR2RGB)
-                                cv2.imwrite('./images_results/' + str(self.frame_counter - self.filename_offset) + '.jpg', saved_image)  # in RGB
+                                self.saveImage(im_tracked, self.frame_counter - self.filename_offset)
 
                 except AttributeError:
                     pass
@@ -272,6 +385,7 @@ class Camera:
 
                 if not self.im_once_set:  # initial sets
                     self.network.setInputImage(self.im, self.frame_counter)
+                    self.notify('network')
                     self.frame_to_process = self.frame_counter
                     self.im_once_set = True
                 if not self.network.getOutputImage()[1]:  # get processed frame
@@ -280,15 +394,9 @@ class Camera:
                         self.im_net = self.network.getOutputImage()[0]
                 if np.any(self.im_net.data):  # set segmented frame
                     if self.gui_cfg == 'on':
-                        im_net = QtGui.QImage(self.im_net.data, self.im_net.shape[1],
-                                                           self.im_net.shape[0],
-                                                           QtGui.QImage.Format_RGB888)
-                        im_net_scaled = im_net.scaled(self.gui.im_net_label.size())
-                        self.gui.im_combined_label.setPixmap(QtGui.QPixmap.fromImage(im_net_scaled))
-                        self.gui.im_net_label.setPixmap(QtGui.QPixmap.fromImage(im_net_scaled))
+                        self.gui.showNet(self.im_net)
                     else:  # gui off, save image
-                        saved_image = cv2.cvtColor(self.im_net, cv2.COLOR_BGR2RGB)
-                        cv2.imwrite('./images_results/' + str(self.frame_counter - self.filename_offset) + '.jpg', saved_image)
+                        self.saveImage(self.im_net, self.frame_counter - self.filename_offset)
                     self.im_once_set = False
                     self.buffer = self.buffer[self.frame_to_process:len(self.buffer)]
 
@@ -304,26 +412,15 @@ class Camera:
 
             if im_tracked is not None:  # last tracked from Tracker
                 if self.gui_cfg == 'on':
-                    im_tracked = QtGui.QImage(im_tracked.data, im_tracked.shape[1],
-                                                im_tracked.shape[0],
-                                                QtGui.QImage.Format_RGB888)
-                    im_tracked_scaled = im_tracked.scaled(self.gui.im_tracked_label.size())
-                    self.gui.im_combined_label.setPixmap(QtGui.QPixmap.fromImage(im_tracked_scaled))
-                    self.gui.im_tracked_label.setPixmap(QtGui.QPixmap.fromImage(im_tracked_scaled))
+                    self.gui.showTracked(im_tracked)
                 else:  # gui off, save image
-                    saved_image = cv2.cvtColor(im_tracked, cv2.COLOR_BGR2RGB)
-                    cv2.imwrite('./images_results/' + str(self.frame_counter) + '.jpg', saved_image)  # in RGB
+                    self.saveImage(im_tracked, self.frame_counter)
 
             if im_net is not None and im_tracked is None:  # last detection from Net
                 if self.gui_cfg == 'on':
-                    im_net = QtGui.QImage(im_net.data, im_net.shape[1],
-                                                im_net.shape[0],
-                                                QtGui.QImage.Format_RGB888)
-                    im_net_scaled = im_net.scaled(self.gui.im_net_label.size())
-                    self.gui.im_combined_label.setPixmap(QtGui.QPixmap.fromImage(im_net_scaled))
-                    self.gui.im_net_label.setPixmap(QtGui.QPixmap.fromImage(im_net_scaled))  #ToDo: set functions de net/tracker image in GUI
+                    self.gui.showNet(im_net)
                 else:  # gui off, save image
-                    cv2.imwrite('./images_results/' + str(self.frame_counter) + '.jpg', im_net)  # in RGB
+                    self.saveImage(im_net, self.frame_counter, to_bgr=False)
 
             if self.tracker.logger_status and not self.network.activated and not self.tracker.activated:
                 self.tracker.logTracking()
@@ -333,4 +430,4 @@ class Camera:
                 if self.gui_cfg == 'on':
                     print('Finished processing video, please close the window...')
                 else:
-                    print('Finished processing video, please close the application (ctrl+c).')
\ No newline at end of file
+                    self.gui.finish()  # headless: the application exits
\ No newline at end of file
@@ -0,0 +1,103 @@
+#
+# Created on Oct, 2026
+#
+# Fixed-capacity ring of preallocated frames shared by the decoder thread
+# (producer) and the camera (consumer). Memory is allocated once, so long
+# live sessions cannot grow it, whatever the speed of the consumer.
+#
+
+import threading
+import numpy as np
+
+OVERFLOW_POLICIES = ('drop_oldest', 'block', 'drop_newest')
+
+
+class FrameRing:
+
+    def __init__(self, capacity, shape, policy='drop_oldest'):
+        ''' FrameRing class keeps up to capacity frames of the given (H, W, 3) shape. '''
+        if policy not in OVERFLOW_POLICIES:
+            raise SystemExit('%s not supported! Supported overflow policies: %s' % (policy, ', '.join(OVERFLOW_POLICIES)))
+        self.capacity = capacity
+        self.policy = policy
+        self.slots = np.zeros((capacity,) + tuple(shape), dtype=np.uint8)
+        self.tags = [None] * capacity
+        self.head = 0  # oldest frame
+        self.count = 0
+        self.closed = False
+        self.condition = threading.Condition()
+        # metrics
+        self.pushed = 0
+        self.popped = 0
+        self.dropped = 0
+        self.high_water = 0
+
+    def reserve(self):
+        ''' Returns the slot where the next frame has to be written (None if the frame has to be dropped). '''
+        with self.condition:
+            if self.count == self.capacity:
+                if self.policy == 'drop_newest':
+                    self.dropped += 1
+                    return None
+                elif self.policy == 'drop_oldest':
+                    self.head = (self.head + 1) % self.capacity
+                    self.count -= 1
+                    self.dropped += 1
+                else:  # block until the consumer frees a slot
+                    while self.count == self.capacity and not self.closed:
+                        self.condition.wait()
+                    if self.closed:
+                        return None
+            return self.slots[(self.head + self.count) % self.capacity]
+
+    def commit(self, tag=None):
+        ''' Publishes the frame written in the reserved slot. '''
+        with self.condition:
+            self.tags[(self.head + self.count) % self.capacity] = tag
+            self.count += 1
+            self.pushed += 1
+            self.high_water = max(self.high_water, self.count)
+            self.condition.notify_all()
+
+    def get(self, timeout=None, out=None):
+        ''' Copies the oldest frame out of the ring and frees its slot.
+        Blocks until a frame is available, returns (None, None) if the ring is closed and empty or on timeout. '''
+        with self.condition:
+            if self.count == 0 and not self.closed:
+                self.condition.wait(timeout)
+            if self.count == 0:
+                return None, None
+            if out is None:
+                out = np.empty_like(self.slots[self.head])
+            np.copyto(out, self.slots[self.head])
+            tag = self.tags[self.head]
+            self.head = (self.head + 1) % self.capacity
+            self.count -= 1
+            self.popped += 1
+            self.condition.notify_all()
+            return out, tag
+
+    def close(self):
+        ''' No more frames will be written: wakes up the waiting threads. '''
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+
+    def isExhausted(self):
+        ''' Checks if the ring is closed and every frame has been consumed. '''
+        with self.condition:
+            return self.closed and self.count == 0
+
+    def getOccupancy(self):
+        ''' Returns the number of frames waiting in the ring. '''
+        return self.count
+
+    def getMetrics(self):
+        ''' Returns the occupancy metrics of the ring. '''
+        with self.condition:
+            return {'capacity': self.capacity,
+                    'occupancy': self.count,
+                    'high_water': self.high_water,
+                    'pushed': self.pushed,
+                    'popped': self.popped,
+                    'dropped': self.dropped}
@@ -8,30 +8,29 @@
 #     master/camera/threadcamera.py
 #
 
-import time
 import threading
-from datetime import datetime
 
-t_cycle = 150  # ms
+from Pipeline import tracing
 
 
 class ThreadCamera(threading.Thread):
 
-    def __init__(self, cam):
+    def __init__(self, cam, pipeline):
         ''' Threading class for Camera. '''
         self.cam = cam
+        self.pipeline = pipeline
+        self.stage = pipeline.getStage('camera')
         threading.Thread.__init__(self)
 
     def run(self):
         ''' Updates the thread. '''
         while True:
-            start_time = datetime.now()
-            self.cam.update()
-            end_time = datetime.now()
-
-            dt = end_time - start_time
-            dtms = ((dt.days * 24 * 60 * 60 + dt.seconds) * 1000 +
-                    dt.microseconds / 1000.0)
-
-            if dtms < t_cycle:
-                time.sleep((t_cycle - dtms) / 1000.0)
+            self.stage.clear()
+            with tracing.span('Camera.update') as args:
+                self.cam.update()
+                args['frame'] = self.cam.frame_counter
+            tracing.counter('queues', self.pipeline.getQueueDepths())
+            self.pipeline.notify('tracker')  # an output may have been consumed
+
+            if self.cam.isStalled():  # wait for the network or the tracker to make progress
+                self.stage.wait()
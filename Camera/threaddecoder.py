@@ -0,0 +1,34 @@
+#
+# Created on Oct, 2026
+#
+# Threading class which decodes the frames of the Camera ahead of time
+# into the preallocated slots of a FrameRing.
+#
+
+import threading
+
+
+class ThreadDecoder(threading.Thread):
+
+    def __init__(self, cam, ring):
+        ''' Threading class for the Camera decoder. '''
+        self.cam = cam
+        self.ring = ring
+        threading.Thread.__init__(self)
+
+    def run(self):
+        ''' Decodes frames until the source is exhausted. '''
+        while True:
+            frame = self.cam.readFrame()
+            if frame is None:
+                if self.cam.source == 'stream_camera':
+                    continue  # no new image from the topic yet
+                break
+            slot = self.ring.reserve()
+            if slot is None:
+                if self.ring.closed:
+                    break
+                continue  # frame dropped (drop_newest policy)
+            self.cam.decodeInto(frame, slot)
+            self.ring.commit()
+        self.ring.close()
@@ -0,0 +1,68 @@
+#
+# Created on Oct, 2026
+#
+# Display adapter between the pipeline threads and the Qt widgets. The threads
+# only publish their latest frame of each panel (a stale frame not shown yet is
+# replaced, never queued), and the Qt thread converts the pending frames at the
+# refresh rate of the monitor: each frame is wrapped in a QImage without
+# copying, scaled once and its pixmap shared by every label of the panel.
+#
+
+import threading
+from collections import OrderedDict
+
+import numpy as np
+from PyQt5 import QtGui
+
+from Pipeline import tracing
+
+
+def toPixmap(frame, size):
+    ''' Returns the pixmap of an RGB frame scaled to a size (the frame is only read, not copied). '''
+    frame = np.ascontiguousarray(frame, dtype=np.uint8)  # no copy for the frames of the pipeline
+    image = QtGui.QImage(frame.data, frame.shape[1], frame.shape[0], frame.strides[0],
+                         QtGui.QImage.Format_RGB888)
+    return QtGui.QPixmap.fromImage(image.scaled(size))  # the frame is released after the conversion
+
+
+class DisplayAdapter:
+
+    def __init__(self, panels):
+        ''' DisplayAdapter class shows the frames published for each panel (name -> list of labels). '''
+        self.panels = panels
+        self.pending = OrderedDict()  # panel -> latest frame, in order of publication
+        self.lock = threading.Lock()
+        # metrics
+        self.shown = 0
+        self.dropped = 0
+
+    def publish(self, panel, frame):
+        ''' Sets the next frame of a panel (from any thread). A frame not shown yet is dropped.
+        The frame is read later by the Qt thread: it must not be modified once published. '''
+        with self.lock:
+            if self.pending.pop(panel, None) is not None:
+                self.dropped += 1
+            self.pending[panel] = frame
+
+    def refresh(self):
+        ''' Shows the pending frames (Qt thread). '''
+        with self.lock:
+            pending, self.pending = self.pending, OrderedDict()
+        if not pending:
+            return
+        with tracing.span('GUI.refresh', panels=len(pending)):
+            for panel, frame in pending.items():
+                labels = self.panels[panel]
+                pixmap = toPixmap(frame, labels[0].size())
+                for label in labels:
+                    label.setPixmap(pixmap)
+        self.shown += len(pending)
+
+    def getPending(self):
+        ''' Returns the number of frames waiting to be shown. '''
+        return len(self.pending)
+
+    def getMetrics(self):
+        ''' Returns the number of frames shown and dropped. '''
+        with self.lock:
+            return {'shown': self.shown, 'dropped': self.dropped, 'pending': len(self.pending)}
@@ -13,11 +13,12 @@
 from PyQt5 import QtGui, QtCore, QtWidgets
 import numpy as np
 
+from GUI.display import DisplayAdapter
+
 
 class GUI(QtWidgets.QWidget):
-    updGUI = QtCore.pyqtSignal()
 
-    def __init__(self, parent=None):
+    def __init__(self, parent=None, refresh_rate=None):
         ''' GUI class creates the GUI that we're going to use to
         preview the live video as well as the results of the application. '''
 
@@ -27,7 +28,6 @@ class GUI(QtWidgets.QWidget):
         self.setWindowTitle("Object Tracker")
         self.resize(1200, 1100)
         self.move(150, 50)
-        self.updGUI.connect(self.update)
 
         # original image labels
         self.im_label = QtWidgets.QLabel(self)
@@ -96,6 +96,18 @@ class GUI(QtWidgets.QWidget):
         self.mode = 'continuous'
         self.count = 0
         self.buffer = []
+        self.pipeline = None
+
+        # the frames published by the pipeline are shown at the refresh rate of the monitor
+        self.display = DisplayAdapter({'input': [self.im_label],
+                                       'net': [self.im_net_label, self.im_combined_label],
+                                       'tracked': [self.im_tracked_label, self.im_combined_label]})
+        if refresh_rate is None:
+            screen = self.app.primaryScreen()
+            refresh_rate = screen.refreshRate() if screen is not None and screen.refreshRate() > 0 else 60
+        self.timer = QtCore.QTimer(self)
+        self.timer.timeout.connect(self.display.refresh)
+        self.timer.start(int(1000 / refresh_rate))
 
     def setNetwork(self, network, t_network):
         ''' Declares the Network object and its corresponding control thread. '''
@@ -106,6 +118,10 @@ class GUI(QtWidgets.QWidget):
         ''' Declares the Tracker object. '''
         self.tracker = tracker
 
+    def setPipeline(self, pipeline):
+        ''' Declares the pipeline used to wake up the stages on user actions. '''
+        self.pipeline = pipeline
+
     def toggleMode(self):
         ''' Changes GUI mode. '''
         if self.mode == 'continuous':
@@ -127,7 +143,22 @@ class GUI(QtWidgets.QWidget):
             self.button_continuous.setStyleSheet('QPushButton {color: green;}')
         else:
             self.button_continuous.setStyleSheet('QPushButton {color: red;}')
+        if self.pipeline is not None:
+            self.pipeline.notify('network')
+            self.pipeline.notify('camera')
 
     def updateOnce(self):
         ''' Run once mode. '''
         self.t_network.runOnce()
+
+    def showInput(self, image):
+        ''' Shows a live image (from any thread). '''
+        self.display.publish('input', image)
+
+    def showNet(self, image):
+        ''' Shows an image processed by the network (from any thread). '''
+        self.display.publish('net', image)
+
+    def showTracked(self, image):
+        ''' Shows an image processed by the tracker (from any thread). '''
+        self.display.publish('tracked', image)
@@ -0,0 +1,60 @@
+#
+# Created on Oct, 2026
+#
+# Headless replacement of the GUI: keeps the mode/state read by the camera
+# without importing Qt, so the application runs on servers without display
+# and exits when the video source is exhausted.
+#
+
+import threading
+
+
+class HeadlessGUI:
+
+    def __init__(self):
+        ''' HeadlessGUI class holds the processing mode of the application when there is no window. '''
+        self.mode = 'continuous'
+        self.count = 0
+        self.buffer = []
+        self.pipeline = None
+        self.network = None
+        self.t_network = None
+        self.tracker = None
+        self.finished = threading.Event()
+        self.status = 0  # exit status of the application
+
+    def setNetwork(self, network, t_network):
+        ''' Declares the Network object and its corresponding control thread. '''
+        self.network = network
+        self.t_network = t_network
+
+    def setTracker(self, tracker):
+        ''' Declares the Tracker object. '''
+        self.tracker = tracker
+
+    def setPipeline(self, pipeline):
+        ''' Declares the pipeline used to wake up the stages. '''
+        self.pipeline = pipeline
+
+    def finish(self):
+        ''' The source is exhausted and every result is written: releases the main thread. '''
+        if not self.finished.is_set():
+            print('Finished processing video.')
+            self.finished.set()
+
+    def fail(self, error):
+        ''' The results can no longer be written: releases the main thread with an error status. '''
+        if not self.finished.is_set():
+            print('Processing stopped: %s' % error)
+            self.status = 1
+            self.finished.set()
+
+    def isFinished(self):
+        ''' Checks if the processing is over. '''
+        return self.finished.is_set()
+
+    def exec_(self, poll_interval=0.5):
+        ''' Blocks until the processing is over (forever with live sources). Returns the exit status. '''
+        while not self.finished.wait(poll_interval):  # timeout: stays responsive to signals
+            pass
+        return self.status
@@ -0,0 +1,66 @@
+#
+# Created on Oct, 2026
+#
+# Line format of the result logs and conversion to the YAML layout of
+# log_network.yaml and log_tracking.yaml (used by the metrics utilities).
+# One entry per line, tab-separated:
+#   <frame> <class> <score> <xmin> <ymin> <xmax> <ymax> [<track id>]
+# or only <frame> for the frames without results.
+#
+# Usage: python2 -m Logger.converter log_network.log log_network.yaml
+#
+
+import sys
+import yaml
+
+
+def formatEntry(entry):
+    ''' Returns the line of a log entry. '''
+    fields = []
+    for item in entry:
+        if isinstance(item, (tuple, list)):
+            fields.extend(str(value) for value in item)
+        else:
+            fields.append(str(item))
+    return '\t'.join(fields) + '\n'
+
+
+def parseEntry(line):
+    ''' Returns the log entry of a line, with the types of the YAML logs. '''
+    fields = line.rstrip('\n').split('\t')
+    entry = [int(fields[0])]
+    if len(fields) > 1:
+        score = fields[2]
+        if score.lstrip('-').isdigit():  # trackers log a fixed integer score
+            score = int(score)
+        entry += [fields[1], score,
+                  [int(fields[3]), int(fields[4])], [int(fields[5]), int(fields[6])]]
+        entry += [int(value) for value in fields[7:]]
+    return entry
+
+
+def readLog(path):
+    ''' Yields the entries of a log file one by one. '''
+    with open(path, 'r') as logfile:
+        for line in logfile:
+            if line.strip():
+                yield parseEntry(line)
+
+
+def logToYaml(log_path, yaml_path):
+    ''' Converts a log to YAML, entry by entry (the log is never fully loaded in memory). '''
+    empty = True
+    with open(yaml_path, 'w') as yamlfile:
+        for entry in readLog(log_path):
+            if empty:
+                yamlfile.write('---\n')
+                empty = False
+            yaml.safe_dump([entry], yamlfile, default_flow_style=False)
+        if empty:
+            yaml.safe_dump([], yamlfile, explicit_start=True, default_flow_style=False)
+
+
+if __name__ == '__main__':
+    if len(sys.argv) != 3:
+        raise SystemExit('\n\tUsage: python2 -m Logger.converter log_network.log log_network.yaml\n')
+    logToYaml(sys.argv[1], sys.argv[2])
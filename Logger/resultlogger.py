@@ -0,0 +1,85 @@
+#
+# Created on Oct, 2026
+#
+# Append-only logger of the results of the network and the tracker.
+# Every entry is written as one tab-separated line as soon as it is produced
+# and a background thread flushes the file periodically, so the memory does
+# not grow with the length of the run and a crash only loses the last lines.
+# The log can be converted to the YAML layout of the metrics utilities.
+#
+
+import atexit
+import threading
+import yaml
+
+from Logger import converter
+from Logger.threadflusher import ThreadFlusher
+
+
+class ResultLogger:
+
+    def __init__(self, path, yaml_path=None, fps_path=None, fps_digits=3, flush_interval=1.0):
+        ''' ResultLogger class streams the entries to path. When closed, the average fps is written
+        to fps_path and the log is converted to YAML in yaml_path (if given). '''
+        self.path = path
+        self.yaml_path = yaml_path
+        self.fps_path = fps_path
+        self.fps_digits = fps_digits
+        self.logfile = open(path, 'w')
+        self.pending = []
+        self.lock = threading.Lock()
+        self.fps_sum = 0.0  # running sum, to get the final fps mean
+        self.fps_count = 0
+        self.entries = 0
+        self.closed = False
+
+        self.t_flusher = ThreadFlusher(self, flush_interval)
+        self.t_flusher.setDaemon(True)
+        self.t_flusher.start()
+        atexit.register(self.flush)  # keep the last lines if the application is closed
+
+    def log(self, entries):
+        ''' Queues log entries: [frame, class, score, (xmin, ymin), (xmax, ymax)(, track id)] or [frame]. '''
+        lines = [converter.formatEntry(entry) for entry in entries]
+        with self.lock:
+            self.pending.extend(lines)
+            self.entries += len(lines)
+
+    def logFps(self, fps_rate, count=1):
+        ''' Adds count times the fps rate to the running mean. '''
+        with self.lock:
+            self.fps_sum += fps_rate * count
+            self.fps_count += count
+
+    def getFps(self):
+        ''' Returns the mean fps logged so far (None if there is none). '''
+        with self.lock:
+            if not self.fps_count:
+                return None
+            return round(self.fps_sum / self.fps_count, self.fps_digits)
+
+    def flush(self):
+        ''' Writes the queued entries to the file. '''
+        with self.lock:
+            lines, self.pending = self.pending, []
+            if self.closed:
+                return
+            if lines:
+                self.logfile.write(''.join(lines))
+            self.logfile.flush()
+
+    def close(self):
+        ''' Flushes and closes the log, then writes the fps file and the YAML log. '''
+        if self.closed:
+            return
+        self.t_flusher.stop()
+        self.flush()
+        with self.lock:
+            self.closed = True
+            self.logfile.close()
+        fps = self.getFps()
+        if self.fps_path and fps is not None:
+            with open(self.fps_path, 'w') as yamlfile:
+                yaml.safe_dump(fps, yamlfile, explicit_start=True, default_flow_style=False)
+        if self.yaml_path:
+            converter.logToYaml(self.path, self.yaml_path)
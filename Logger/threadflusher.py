@@ -0,0 +1,26 @@
+#
+# Created on Oct, 2026
+#
+# Threading class which periodically writes the queued entries of a ResultLogger.
+#
+
+import threading
+
+
+class ThreadFlusher(threading.Thread):
+
+    def __init__(self, logger, interval):
+        ''' Threading class for the ResultLogger. '''
+        self.logger = logger
+        self.interval = interval
+        self.stopped = threading.Event()
+        threading.Thread.__init__(self)
+
+    def run(self):
+        ''' Flushes the logger every interval seconds until stopped. '''
+        while not self.stopped.wait(self.interval):
+            self.logger.flush()
+
+    def stop(self):
+        ''' Stops the thread after the current flush. '''
+        self.stopped.set()
@@ -9,22 +9,22 @@
 # https://github.com/JdeRobot/dl-objectdetector
 #
 
-import os
 import time
-import yaml
+import threading
 import numpy as np
 from PIL import Image
 import h5py
-import cv2
 
 from keras import backend as K
 from keras.models import load_model
 from keras.preprocessing import image
-from Net.Keras.keras_loss_function.keras_ssd_loss import SSDLoss
 from Net.Keras.keras_layers.keras_layer_AnchorBoxes import AnchorBoxes
 from Net.Keras.keras_layers.keras_layer_DecodeDetections import DecodeDetections
 from Net.Keras.keras_layers.keras_layer_L2Normalization import L2Normalization
-from Net.utils import label_map_util, create_model_from_weights
+from Net.utils import label_map_cache, create_model_from_weights, postprocessing
+from Net.utils.detections import Detections
+from Net.utils.overlay import OverlayRenderer
+from Pipeline import instrumentation
 
 
 LABELS_DICT = {'voc': 'Net/labels/pascal_label_map.pbtxt',
@@ -40,9 +40,10 @@ class DetectionNetwork:
         # attributes from dl-objecttracker architecture
         self.input_image = None
         self.output_image = None
+        self.output_source = None  # frame and detections of the output image, rendered lazily
+        self.output_lock = threading.Lock()
         self.activated = True
         self.detection = None
-        self.label = None
         self.colors = None
         self.frame = None
         # attributes set by yml config
@@ -50,71 +51,53 @@ class DetectionNetwork:
         # new necessary attributes from dl-objectdetector network architecture
         self.original_height = None
         self.original_width = None
-        self.font = cv2.FONT_HERSHEY_SIMPLEX
-        self.scale = 0.5
-        COLORS = label_map_util.COLORS
 
         self.framework = "Keras"
         self.net_has_masks = False
-        self.log_network_results = []
-        self.fps_network_results = []
-        self.log_done = False
+        self.result_logger = None
         self.logger_status = True
         self.image_scale = (None, None)
 
         # Parse the dataset to get which labels to yield
         labels_file = LABELS_DICT[net_model['Dataset'].lower()]
-        label_map = label_map_util.load_labelmap(labels_file)  # loads the labels map.
-        categories = label_map_util.convert_label_map_to_categories(label_map, max_num_classes=100000)
-        category_index = label_map_util.create_category_index(categories)
-        self.classes = {}
-        # We build is as a dict because of gaps on the labels definitions
-        for cat in category_index:
-            self.classes[cat] = str(category_index[cat]['name'])
-
-        # We create the color dictionary for the bounding boxes.
-        self.colors = {}
-        idx = 0
-        for _class in self.classes.values():
-            self.colors[_class] = COLORS[idx]
-            idx = + 1
+        # class names and box colors indexed by class id (compiled once, then cached)
+        self.label_table, self.colors = label_map_cache.load_label_map(labels_file)
+        self.renderer = OverlayRenderer(self.colors)
 
         MODEL_FILE = 'Net/Keras/' + net_model['Model']
 
         file = h5py.File(MODEL_FILE, 'r')
 
-        ssd_loss = SSDLoss(neg_pos_ratio=3, n_neg_min=0, alpha=1.0)
+        custom_objects = {'AnchorBoxes': AnchorBoxes,
+                          'L2Normalization': L2Normalization,
+                          'DecodeDetections': DecodeDetections}
 
         K.clear_session()
 
+        start_time = time.time()
         if str(file.items()[0][0]) == 'model_weights':
             print("Full model detected. Loading it...")
             try:
-                self.model = load_model(MODEL_FILE, custom_objects={'AnchorBoxes': AnchorBoxes,
-                                                               'L2Normalization': L2Normalization,
-                                                               'DecodeDetections': DecodeDetections,
-                                                               'compute_loss': ssd_loss.compute_loss})
+                # inference only: the loss and the optimizer are not compiled
+                self.model = load_model(MODEL_FILE, custom_objects=custom_objects, compile=False)
             except Exception as e:
                 SystemExit(e)
         else:
             print("Weights file detected. Creating a model and loading the weights into it...")
             print("Model file: ", MODEL_FILE)
-            self.model = create_model_from_weights.create_model(MODEL_FILE,
-                                                                ssd_loss,
-                                                                len(self.classes))
+            self.model = create_model_from_weights.load_cached_model(MODEL_FILE,
+                                                                     np.count_nonzero(self.label_table != ''),
+                                                                     custom_objects)
+        print('Model loaded in %.2f s.' % (time.time() - start_time))
 
         # the Keras network works on 300x300 images. Reference sizes:
         input_size = self.model.input.shape.as_list()
         self.img_height = input_size[1]
         self.img_width = input_size[2]
-        # Factors to rescale the output bounding boxes
-        self.height_factor = np.true_divide(self.img_height, self.img_height)
-        self.width_factor = np.true_divide(self.img_width, self.img_width)
 
         # Output preallocation
+        self.detection = Detections.empty(self.label_table)
         self.predictions = np.asarray([])
-        self.boxes = np.asarray([])
-        self.scores = np.asarray([])
 
         dummy = np.zeros([1, self.img_height, self.img_width, 3])
         self.model.predict(dummy)
@@ -127,44 +110,23 @@ class DetectionNetwork:
 
             start_time = time.time()
 
-            # preprocessing
-            as_image = Image.fromarray(input_image)
-            resized = as_image.resize((self.img_width, self.img_height), Image.NEAREST)
-            np_resized = image.img_to_array(resized)
-
-            input_col = []
-            input_col.append(np_resized)
-            network_input = np.array(input_col)
+            with instrumentation.timer('preprocess'):
+                network_input = np.array([self.preprocess(input_image)])
             # Prediction
-            y_pred = self.model.predict(network_input)
-
-            self.label = []
-            self.scores = []
-            boxes = []
-
-            # which predictions are above the confidence threshold?
-            y_pred_thresh = [y_pred[k][y_pred[k,:,1] > self.confidence_threshold] for k in range(y_pred.shape[0])]
-            # iterate over them
-            for box in y_pred_thresh[0]:
-                self.label.append(self.classes[int(box[0])])
-                self.scores.append(box[1])
-                xmin = int(box[2] * self.width_factor)
-                ymin = int(box[3] * self.height_factor)
-                xmax = int(box[4] * self.width_factor)
-                ymax = int(box[5] * self.height_factor)
-                boxes.append([ymin, xmin, ymax, xmax])
-            self.detection = boxes
+            with instrumentation.timer('inference'):
+                y_pred = self.model.predict(network_input)
+
+            with instrumentation.timer('postprocessing'):
+                width_factor, height_factor = postprocessing.keras_scale_factors(input_image.shape, self.img_height,
+                                                                                 self.img_width)
+                self.detection = postprocessing.keras_detections(y_pred[0], self.confidence_threshold, self.label_table,
+                                                                 width_factor, height_factor)
 
             fps_rate = 1.0 / (time.time() - start_time)  # fps calculation includes preprocessing and postprocessing
 
-            if self.net_has_masks: #TODO: draw masks of mask nets, use tf obj det tutorial
-                #from Net.utils import visualization_utils
-                #print('draw mask')
-                #visualization_utils.draw_mask_on_image_array(self.input_image, masks)
-                #self.display_instances(self.input_image, self.detection, masks, self.label, self.scores)
-                detected_image = self.renderModifiedImage(fps_rate)
-            else:
-                detected_image = self.renderModifiedImage(fps_rate)
+            self.logDetections(self.frame, self.detection, fps_rate)
+            #TODO: draw masks of mask nets (net_has_masks), use tf obj det tutorial
+            detected_image = None  # rendered on demand by getOutputImage
             self.activated = False
             zeros = False
             # print('Detection done!')
@@ -173,83 +135,98 @@ class DetectionNetwork:
             detected_image = np.array(np.zeros((480, 320), dtype=np.int32))  # size of images in gui
             zeros = True
 
-        self.output_image = [detected_image, zeros]
-
-    def renderModifiedImage(self, fps_rate):  # from utils visualize of Tensorflow folder
-        image_np = np.copy(self.input_image)
-
-        detection_boxes = self.detection
-        detection_classes = self.label
-        detection_scores = self.scores
-
-        for index in range(len(detection_classes)):
-            _class = detection_classes[index]
-            score = detection_scores[index]
-            rect = detection_boxes[index]
-            xmin = rect[1]
-            ymin = rect[0]
-            xmax = rect[3]
-            ymax = rect[2]
-            cv2.rectangle(image_np, (xmin, ymin), (xmax, ymax), self.colors[_class], 3)
-            # log
-            if self.logger_status:
-                class_no_spaces = _class.replace(" ", "")  # to allow the use of metrics calculation utility
-                xmin_rescaled = int(xmin * self.image_scale[0])
-                xmax_rescaled = int(xmax * self.image_scale[0])
-                ymin_rescaled = int(ymin * self.image_scale[1])
-                ymax_rescaled = int(ymax * self.image_scale[1])
-                self.log_network_results.append([self.frame - 1, class_no_spaces, str(score), (xmin_rescaled, ymin_rescaled), (xmax_rescaled, ymax_rescaled)])
-                self.fps_network_results.append(fps_rate)
-
-            label = "{0} ({1} %)".format(_class, int(score * 100))
-            [size, base] = cv2.getTextSize(label, self.font, self.scale, 2)
-
-            points = np.array([[[xmin, ymin + base],
-                                [xmin, ymin - size[1]],
-                                [xmin + size[0], ymin - size[1]],
-                                [xmin + size[0], ymin + base]]], dtype=np.int32)
-            cv2.fillPoly(image_np, points, (0, 0, 0))
-            cv2.putText(image_np, label, (xmin, ymin), self.font, self.scale, (255, 255, 255), 2)
-
-        return image_np
+        with self.output_lock:
+            self.output_image = [detected_image, zeros]
+            self.output_source = (input_image, self.detection)
+
+    def detectBatch(self, images):
+        ''' Runs the network on a batch of images with a single model call, without logging.
+        Returns a list with the Detections of each image, in pixels of the images. '''
+        with instrumentation.timer('preprocess'):
+            network_input = np.array([self.preprocess(im) for im in images])
+        with instrumentation.timer('inference'):
+            y_pred = self.model.predict(network_input, batch_size=len(images))
+        with instrumentation.timer('postprocessing'):
+            results = []
+            for k in range(y_pred.shape[0]):  # boxes in pixels of each image (crops may have any size)
+                width_factor, height_factor = postprocessing.keras_scale_factors(images[k].shape, self.img_height,
+                                                                                 self.img_width)
+                results.append(postprocessing.keras_detections(y_pred[k], self.confidence_threshold, self.label_table,
+                                                               width_factor, height_factor))
+            return results
+
+    def predict_batch(self, images, frame_numbers):
+        ''' Runs the network on a batch of frames with a single model call.
+        Returns a list with the Detections of each frame. '''
+        start_time = time.time()
+
+        results = self.detectBatch(images)
+
+        fps_rate = len(images) / (time.time() - start_time)  # frames per second of the whole batch
+
+        for frame_number, detection in zip(frame_numbers, results):
+            self.logDetections(frame_number, detection, fps_rate)
+
+        # the last frame of the batch becomes the output of the network
+        self.detection = results[-1]
+        self.frame = frame_numbers[-1]
+        self.original_height = images[-1].shape[0]
+        self.original_width = images[-1].shape[1]
+        self.activated = False
+        return results
+
+    def preprocess(self, input_image):
+        ''' Resizes an image to the input size of the model. '''
+        as_image = Image.fromarray(input_image)
+        resized = as_image.resize((self.img_width, self.img_height), Image.NEAREST)
+        return image.img_to_array(resized)
+
+    def logDetections(self, frame_number, detection, fps_rate):
+        ''' Appends the detections of a frame to the log. '''
+        if not self.logger_status or self.result_logger is None:
+            return
+        self.result_logger.log(detection.logEntries(frame_number - 1, self.image_scale))
+        self.result_logger.logFps(fps_rate, len(detection))
 
     def logNetwork(self):
-        if os.path.isfile('log_network.yaml') and not self.log_done:
-            with open('log_network.yaml', 'w') as yamlfile:
-                yaml.safe_dump(self.log_network_results, yamlfile, explicit_start=True, default_flow_style=False)
-        if os.path.isfile('fps_network.yaml') and not self.log_done:
-            with open('fps_network.yaml', 'w') as yamlfile:
-                self.fps_network_results = round((sum(self.fps_network_results) / len(self.fps_network_results)),
-                                                  3)
-                yaml.safe_dump(self.fps_network_results, yamlfile, explicit_start=True, default_flow_style=False)
-                self.log_done = True
+        ''' Closes the log of the network (written incrementally during the run). '''
+        if self.result_logger is not None and not self.result_logger.closed:
+            self.result_logger.close()
             print('Log network done!')
 
+    def setResultLogger(self, result_logger):
+        ''' Sets the logger where the detections are streamed. '''
+        self.result_logger = result_logger
+
     def setLoggerStatus(self, logger_status):
         self.logger_status = logger_status
 
     def setInputImage(self, im, frame_number):
         ''' Sets the input image of the network. '''
-        self.input_image = im
+        self.input_image = im  # never modified: the tracker draws on copies of the buffered frames
         self.frame = frame_number
         self.original_height = im.shape[0]
         self.original_width = im.shape[1]
 
     def getOutputImage(self):
-        ''' Returns the image with the segmented objects on it. '''
-        return self.output_image
+        ''' Returns the image with the segmented objects on it (drawn the first time it is asked for). '''
+        with self.output_lock:
+            if self.output_image is not None and self.output_image[0] is None:
+                image, detection = self.output_source
+                self.output_image[0] = self.renderer.render(image, detection)
+            return self.output_image
 
     def getProcessedFrame(self):
         ''' Returns the index of the frame processed by the net. '''
         return self.frame
 
     def getOutputDetection(self):
-        ''' Returns the bounding boxes. '''
+        ''' Returns the Detections (bounding boxes, classes and scores). '''
         return self.detection
 
     def getOutputLabel(self):
         ''' Returns the labels. '''
-        return self.label
+        return list(self.detection.labels)
 
     def getColorList(self):
         ''' Returns the colors for the bounding boxes. '''
@@ -11,12 +11,15 @@
 
 import os
 import time
-import yaml
+import threading
 import numpy as np
-import cv2
 import tensorflow as tf
 
-from Net.utils import label_map_util
+from Net.TensorFlow import optimize_graph
+from Net.utils import label_map_cache, postprocessing
+from Net.utils.detections import Detections
+from Net.utils.overlay import OverlayRenderer
+from Pipeline import instrumentation
 
 LABELS_DICT = {'voc': 'Net/labels/pascal_label_map.pbtxt',
                'coco': 'Net/labels/mscoco_label_map.pbtxt',
@@ -31,9 +34,10 @@ class DetectionNetwork:
         # attributes from dl-objecttracker network architecture
         self.input_image = None
         self.output_image = None
+        self.output_source = None  # frame and detections of the output image, rendered lazily
+        self.output_lock = threading.Lock()
         self.activated = True
         self.detection = None
-        self.label = None
         self.colors = None
         self.frame = None
         # attributes set by yml config
@@ -41,43 +45,35 @@ class DetectionNetwork:
         # new necessary attributes from dl-objectdetector network architecture
         self.original_height = None
         self.original_width = None
-        self.font = cv2.FONT_HERSHEY_SIMPLEX
-        self.scale = 0.5
-        COLORS = label_map_util.COLORS
 
         self.framework = "TensorFlow"
         self.net_has_masks = False
-        self.log_network_results = []
-        self.fps_network_results = []
-        self.log_done = False
+        self.result_logger = None
         self.logger_status = True
         self.image_scale = (None, None)
 
         labels_file = LABELS_DICT[net_model['Dataset'].lower()]
-        label_map = label_map_util.load_labelmap(labels_file)  # loads the labels map.
-        categories = label_map_util.convert_label_map_to_categories(label_map, max_num_classes= 999999)
-        category_index = label_map_util.create_category_index(categories)
-        self.classes = {}
-        # We build is as a dict because of gaps on the labels definitions
-        for cat in category_index:
-            self.classes[cat] = str(category_index[cat]['name'])
-
-        # We create the color dictionary for the bounding boxes.
-        self.colors = {}
-        idx = 0
-        for _class in self.classes.values():
-            self.colors[_class] = COLORS[idx]
-            idx = + 1
-
-        # Frozen inference graph, written on the file
+        # class names and box colors indexed by class id (compiled once, then cached)
+        self.label_table, self.colors = label_map_cache.load_label_map(labels_file)
+        self.renderer = OverlayRenderer(self.colors, caption="neural detection")
+        self.detection = Detections.empty(self.label_table)
+
+        # Frozen inference graph, written on the file (its optimized version if available)
         CKPT = 'Net/TensorFlow/' + net_model['Model']
-        detection_graph = tf.Graph() # new graph instance.
-        with detection_graph.as_default():
-            od_graph_def = tf.GraphDef()
-            with tf.gfile.GFile(CKPT, 'rb') as fid:
-                serialized_graph = fid.read()
-                od_graph_def.ParseFromString(serialized_graph)
-                tf.import_graph_def(od_graph_def, name='')
+        input_size = net_model.get('InputSize')
+        detection_graph = None
+        if os.path.isfile(optimize_graph.optimized_path(CKPT)) and not optimize_graph.is_up_to_date(CKPT):
+            print('Optimized graph ignored: %s was modified since the optimization.' % CKPT)
+        elif os.path.isfile(optimize_graph.optimized_path(CKPT)):
+            detection_graph = self.loadGraph(optimize_graph.optimized_path(CKPT))
+            input_shape = detection_graph.get_tensor_by_name('image_tensor:0').shape.as_list()
+            if input_size is not None and input_shape[1:3] not in ([None, None], [input_size[1], input_size[0]]):
+                print('Optimized graph ignored: built for %sx%s px images.' % (input_shape[2], input_shape[1]))
+                detection_graph = None
+            else:
+                print('Optimized graph loaded: %s' % optimize_graph.optimized_path(CKPT))
+        if detection_graph is None:
+            detection_graph = self.loadGraph(CKPT)
 
         # Set additional parameters for the TF session
         gpu_options = tf.GPUOptions(per_process_gpu_memory_fraction=0.8)
@@ -90,16 +86,17 @@ class DetectionNetwork:
         self.detection_scores = detection_graph.get_tensor_by_name('detection_scores:0')
         self.detection_classes = detection_graph.get_tensor_by_name('detection_classes:0')
         self.num_detections = detection_graph.get_tensor_by_name('num_detections:0')
-        for op in detection_graph.get_operations():
-            if op.name == 'detection_masks':
-                self.net_has_masks = True
-                self.detection_masks = detection_graph.get_tensor_by_name('detection_masks:0')
+        try:
+            self.detection_masks = detection_graph.get_tensor_by_name('detection_masks:0')
+            self.net_has_masks = True
+        except KeyError:  # no masks (or stripped by the optimization)
+            pass
 
-        self.scores = []
         self.predictions = []
 
         # Dummy initialization (otherwise it takes longer then)
-        dummy_tensor = np.zeros((1,1,1,3), dtype=np.int32)
+        input_shape = self.image_tensor.shape.as_list()
+        dummy_tensor = np.zeros((1, input_shape[1] or 1, input_shape[2] or 1, 3), dtype=np.int32)
         if self.net_has_masks:
             self.sess.run(
                 [self.detection_boxes, self.detection_scores, self.detection_classes, self.num_detections, self.detection_masks],
@@ -111,6 +108,13 @@ class DetectionNetwork:
 
         print("Network ready!")
 
+    def loadGraph(self, path):
+        ''' Imports a frozen graph in a new graph. '''
+        detection_graph = tf.Graph()
+        with detection_graph.as_default():
+            tf.import_graph_def(optimize_graph.load_graph_def(path), name='')
+        return detection_graph
+
     def predict(self):
         input_image = self.input_image
         if input_image is not None:
@@ -118,37 +122,26 @@ class DetectionNetwork:
             start_time = time.time()
 
             image_np_expanded = np.expand_dims(input_image, axis=0)
-            if self.net_has_masks:
-                (boxes, scores, predictions, _, masks) = self.sess.run(
-                    [self.detection_boxes, self.detection_scores, self.detection_classes, self.num_detections, self.detection_masks],
-                    feed_dict={self.image_tensor: image_np_expanded})
-            else:
-                (boxes, scores, predictions, _) = self.sess.run(
-                    [self.detection_boxes, self.detection_scores, self.detection_classes, self.num_detections],
-                    feed_dict={self.image_tensor: image_np_expanded})
-
-            # We only keep the most confident predictions.
-            conf = scores > self.confidence_threshold  # bool array
-            boxes = boxes[conf]
-            # aux variable for avoiding race condition while int casting
-            tmp_boxes = np.zeros([len(boxes), 4]).astype(int)
-            tmp_boxes[:, [0]] = boxes[:, [1]] * self.original_width  #xmin
-            tmp_boxes[:, [2]] = boxes[:, [3]] * self.original_width  #xmax
-            tmp_boxes[:, [3]] = boxes[:, [2]] * self.original_height  #ymin
-            tmp_boxes[:, [1]] = boxes[:, [0]] * self.original_height  #ymax
-            self.detection = tmp_boxes
-            self.scores = scores[conf]
-            predictions = predictions[conf].astype(int)
-            self.label = []
-            for pred in predictions:
-                self.label.append(self.classes[pred])
+            with instrumentation.timer('inference'):
+                if self.net_has_masks:
+                    (boxes, scores, predictions, _, masks) = self.sess.run(
+                        [self.detection_boxes, self.detection_scores, self.detection_classes, self.num_detections, self.detection_masks],
+                        feed_dict={self.image_tensor: image_np_expanded})
+                else:
+                    (boxes, scores, predictions, _) = self.sess.run(
+                        [self.detection_boxes, self.detection_scores, self.detection_classes, self.num_detections],
+                        feed_dict={self.image_tensor: image_np_expanded})
+
+            with instrumentation.timer('postprocessing'):
+                self.detection = postprocessing.tensorflow_detections(boxes[0], scores[0], predictions[0],
+                                                                      self.confidence_threshold, self.label_table,
+                                                                      self.original_height, self.original_width)
 
             fps_rate = 1.0 / (time.time() - start_time)  # fps calculation includes preprocessing and postprocessing
 
-            if self.net_has_masks:  #TODO: draw masks of mask nets, use tf obj det tutorial
-                detected_image = self.renderModifiedImage(fps_rate)
-            else:
-                detected_image = self.renderModifiedImage(fps_rate)
+            self.logDetections(self.frame, self.detection, fps_rate)
+            #TODO: draw masks of mask nets (net_has_masks), use tf obj det tutorial
+            detected_image = None  # rendered on demand by getOutputImage
             self.activated = False
             zeros = False
             # print('Detection done!')
@@ -157,81 +150,93 @@ class DetectionNetwork:
             detected_image = np.array(np.zeros((480, 320), dtype=np.int32))  # size of images in gui
             zeros = True
 
-        self.output_image = [detected_image, zeros]
-
-    def renderModifiedImage(self, fps_rate):  # from utils visualize of Tensorflow folder
-        image_np = np.copy(self.input_image)
-
-        detection_boxes = self.detection
-        detection_classes = self.label
-        detection_scores = self.scores
-
-        for index in range(len(detection_classes)):
-            _class = detection_classes[index]
-            score = detection_scores[index]
-            rect = detection_boxes[index]
-            xmin = rect[0]
-            ymin = rect[3]
-            xmax = rect[2]
-            ymax = rect[1]
-            cv2.rectangle(image_np, (xmin, ymin), (xmax, ymax), self.colors[_class], 3)
-            # log
-            if self.logger_status:
-                class_no_spaces = _class.replace(" ", "")  # to allow the use of metrics calculation utility
-                xmin_rescaled = int(xmin * self.image_scale[0])
-                xmax_rescaled = int(xmax * self.image_scale[0])
-                ymin_rescaled = int(ymin * self.image_scale[1])
-                ymax_rescaled = int(ymax * self.image_scale[1])
-                self.log_network_results.append([self.frame - 1, class_no_spaces, str(score), (str(xmin_rescaled), str(ymin_rescaled)), (str(xmax_rescaled), str(ymax_rescaled))])
-                self.fps_network_results.append(fps_rate)
-
-            label = "{0} ({1} %)".format(_class, int(score*100))
-            [size, base] = cv2.getTextSize(label, self.font, self.scale, 2)
-
-            points = np.array([[[xmin, ymin + base],
-                                [xmin, ymin - size[1]],
-                                [xmin + size[0], ymin - size[1]],
-                                [xmin + size[0], ymin + base]]], dtype=np.int32)
-            cv2.fillPoly(image_np, points, (0, 0, 0))
-            cv2.putText(image_np, label, (xmin, ymin), self.font, self.scale, (255, 255, 255), 2)
-            cv2.putText(image_np, "neural detection", (150, 20), self.font, self.scale, (255, 0, 0), 2)
-
-        return image_np
+        with self.output_lock:
+            self.output_image = [detected_image, zeros]
+            self.output_source = (input_image, self.detection)
+
+    def detectBatch(self, images):
+        ''' Runs the network on a batch of images (same size) with a single session call, without logging.
+        Returns a list with the Detections of each image, in pixels of the images. '''
+        batch = np.stack(images)
+        height, width = batch.shape[1], batch.shape[2]
+        with instrumentation.timer('inference'):
+            if self.net_has_masks:
+                (boxes, scores, predictions, _, masks) = self.sess.run(
+                    [self.detection_boxes, self.detection_scores, self.detection_classes, self.num_detections, self.detection_masks],
+                    feed_dict={self.image_tensor: batch})
+            else:
+                (boxes, scores, predictions, _) = self.sess.run(
+                    [self.detection_boxes, self.detection_scores, self.detection_classes, self.num_detections],
+                    feed_dict={self.image_tensor: batch})
+
+        with instrumentation.timer('postprocessing'):
+            return [postprocessing.tensorflow_detections(boxes[k], scores[k], predictions[k],
+                                                         self.confidence_threshold, self.label_table, height, width)
+                    for k in range(len(images))]
+
+    def predict_batch(self, images, frame_numbers):
+        ''' Runs the network on a batch of frames (same size) with a single session call.
+        Returns a list with the Detections of each frame. '''
+        start_time = time.time()
+
+        results = self.detectBatch(images)
+
+        fps_rate = len(images) / (time.time() - start_time)  # frames per second of the whole batch
+
+        for frame_number, detection in zip(frame_numbers, results):
+            self.logDetections(frame_number, detection, fps_rate)
+
+        # the last frame of the batch becomes the output of the network
+        self.detection = results[-1]
+        self.frame = frame_numbers[-1]
+        self.original_height = images[-1].shape[0]
+        self.original_width = images[-1].shape[1]
+        self.activated = False
+        return results
+
+    def logDetections(self, frame_number, detection, fps_rate):
+        ''' Appends the detections of a frame to the log. '''
+        if not self.logger_status or self.result_logger is None:
+            return
+        self.result_logger.log(detection.logEntries(frame_number - 1, self.image_scale))
+        self.result_logger.logFps(fps_rate, len(detection))
 
     def logNetwork(self):
-        if os.path.isfile('log_network.yaml') and not self.log_done:
-            with open('log_network.yaml', 'w') as yamlfile:
-                yaml.safe_dump(self.log_network_results, yamlfile, explicit_start=True, default_flow_style=False)
-        if os.path.isfile('fps_network.yaml') and not self.log_done:
-            with open('fps_network.yaml', 'w') as yamlfile:
-                self.fps_network_results = round((sum(self.fps_network_results) / len(self.fps_network_results)),
-                                                  3)
-                yaml.safe_dump(self.fps_network_results, yamlfile, explicit_start=True, default_flow_style=False)
-                self.log_done = True
+        ''' Closes the log of the network (written incrementally during the run). '''
+        if self.result_logger is not None and not self.result_logger.closed:
+            self.result_logger.close()
             print('Log network done!')
 
+    def setResultLogger(self, result_logger):
+        ''' Sets the logger where the detections are streamed. '''
+        self.result_logger = result_logger
+
     def setInputImage(self, im, frame_number):
         ''' Sets the input image of the network. '''
-        self.input_image = im
+        self.input_image = im  # never modified: the tracker draws on copies of the buffered frames
         self.frame = frame_number
         self.original_height = im.shape[0]
         self.original_width = im.shape[1]
 
     def getOutputImage(self):
-        ''' Returns the image with the segmented objects on it. '''
-        return self.output_image
+        ''' Returns the image with the segmented objects on it (drawn the first time it is asked for). '''
+        with self.output_lock:
+            if self.output_image is not None and self.output_image[0] is None:
+                image, detection = self.output_source
+                self.output_image[0] = self.renderer.render(image, detection)
+            return self.output_image
 
     def getProcessedFrame(self):
         ''' Returns the index of the frame processed by the net. '''
         return self.frame
 
     def getOutputDetection(self):
-        ''' Returns the bounding boxes. '''
+        ''' Returns the Detections (bounding boxes, classes and scores). '''
         return self.detection
 
     def getOutputLabel(self):
         ''' Returns the labels. '''
-        return self.label
+        return list(self.detection.labels)
 
     def getColorList(self):
         ''' Returns the colors for the bounding boxes. '''
@@ -0,0 +1,113 @@
+#
+# Created on Oct, 2026
+#
+# Offline optimization of a frozen detection graph for inference: the nodes that
+# are not needed to compute the outputs (training ops, masks if unused) are
+# stripped, constants and batch normalizations are folded, and the input shape
+# is fixed to the InputSize of the configuration. The result is saved as
+# <model>_optimized.pb, loaded automatically by the TensorFlow network while the
+# size and mtime of the source graph match the ones stored in <model>_optimized.pb.source.
+#
+# Usage: python2 -m Net.TensorFlow.optimize_graph Net/TensorFlow/faster.pb [--config objecttracker.yml]
+#
+
+import argparse
+import os
+import time
+
+import yaml
+import tensorflow as tf
+
+INPUTS = ['image_tensor']
+OUTPUTS = ['detection_boxes', 'detection_scores', 'detection_classes', 'num_detections']
+MASKS = 'detection_masks'
+
+
+def optimized_path(path):
+    ''' Returns the path of the optimized version of a frozen graph. '''
+    return path.rsplit('.pb', 1)[0] + '_optimized.pb'
+
+
+def source_stamp(path):
+    ''' Returns the size and modification time of a graph, which identify the version of the file. '''
+    return '%d %.6f' % (os.path.getsize(path), os.path.getmtime(path))
+
+
+def stamp_path(path):
+    ''' Returns the path of the file with the stamp of the source of an optimized graph. '''
+    return path + '.source'
+
+
+def is_up_to_date(path):
+    ''' Checks if the optimized version of a frozen graph exists and was built from its current version. '''
+    try:
+        with open(stamp_path(optimized_path(path)), 'r') as stream:
+            return os.path.isfile(optimized_path(path)) and stream.read().strip() == source_stamp(path)
+    except (IOError, OSError):  # no stamp: unknown source
+        return False
+
+
+def load_graph_def(path):
+    ''' Reads a frozen graph. '''
+    graph_def = tf.GraphDef()
+    with tf.gfile.GFile(path, 'rb') as fid:
+        graph_def.ParseFromString(fid.read())
+    return graph_def
+
+
+def optimize(graph_def, input_size, keep_masks=False):
+    '''
+    Optimizes a frozen detection graph for inference.
+
+    Arguments:
+        graph_def (GraphDef): frozen graph with an `image_tensor` input.
+        input_size (list): `[width, height]` of the images fed to the network (InputSize).
+        keep_masks (bool): keeps the `detection_masks` output (if any).
+
+    Returns:
+        The optimized GraphDef.
+    '''
+    from tensorflow.tools.graph_transforms import TransformGraph  # only needed offline, not by the network
+    outputs = list(OUTPUTS)
+    if keep_masks and any(node.name == MASKS for node in graph_def.node):
+        outputs.append(MASKS)
+    transforms = ['strip_unused_nodes(type=uint8, shape="-1,%d,%d,3")' % (input_size[1], input_size[0]),
+                  'remove_nodes(op=CheckNumerics)',
+                  'fold_constants(ignore_errors=true)',
+                  'fold_batch_norms',
+                  'fold_old_batch_norms',
+                  'strip_unused_nodes(type=uint8, shape="-1,%d,%d,3")' % (input_size[1], input_size[0]),
+                  'sort_by_execution_order']
+    return TransformGraph(graph_def, INPUTS, outputs, transforms)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Optimizes a frozen detection graph for inference.')
+    parser.add_argument('model', help='frozen graph (.pb)')
+    parser.add_argument('--output', help='optimized graph (default: <model>_optimized.pb)')
+    parser.add_argument('--config', default='objecttracker.yml', help='configuration with the InputSize')
+    parser.add_argument('--input-size', type=int, nargs=2, metavar=('WIDTH', 'HEIGHT'),
+                        help='size of the input images (default: Network->InputSize of the configuration)')
+    parser.add_argument('--keep-masks', action='store_true', help='keep the detection_masks output')
+    args = parser.parse_args()
+
+    input_size = args.input_size
+    if input_size is None:
+        with open(args.config, 'r') as stream:
+            input_size = yaml.safe_load(stream)['ObjectTracker']['Network']['InputSize']
+    output = args.output or optimized_path(args.model)
+
+    start_time = time.time()
+    graph_def = load_graph_def(args.model)
+    optimized = optimize(graph_def, input_size, args.keep_masks)
+    with tf.gfile.GFile(output, 'wb') as fid:
+        fid.write(optimized.SerializeToString())
+    with open(stamp_path(output), 'w') as stream:
+        stream.write(source_stamp(args.model) + '\n')
+    print('%d nodes -> %d nodes, input fixed to %dx%d px (%.2f s).' % (
+        len(graph_def.node), len(optimized.node), input_size[0], input_size[1], time.time() - start_time))
+    print('Optimized graph saved to %s.' % output)
+
+
+if __name__ == '__main__':
+    main()
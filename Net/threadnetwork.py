@@ -8,43 +8,50 @@
 #
 
 
-import time
 import threading
 from datetime import datetime
 
+from Pipeline import tracing
+
 
 class ThreadNetwork(threading.Thread):
 
-    def __init__(self, network):
+    def __init__(self, network, pipeline):
         ''' Threading class for Camera. '''
 
-        self.t_cycle = 150  # ms
         self.network = network
+        self.pipeline = pipeline
+        self.stage = pipeline.getStage('network')
         self.framerate = 0
 
         threading.Thread.__init__(self)
 
+    def hasWork(self):
+        ''' The network runs when activated with a new input (or once to initialize its output). '''
+        return self.network.activated and (self.network.input_image is not None or
+                                           self.network.output_image is None)
+
     def run(self):
         ''' Updates the thread. '''
         while True:
+            self.stage.clear()
+            if not self.hasWork():
+                self.framerate = 0
+                self.stage.wait()
+                continue
+
             start_time = datetime.now()
-            if self.network.activated:
+            with tracing.span('ThreadNetwork.run', frame=self.network.frame):
                 self.network.predict()
             end_time = datetime.now()
 
             dt = end_time - start_time
             dtms = ((dt.days * 24 * 60 * 60 + dt.seconds) * 1000 +
                     dt.microseconds / 1000.0)
-
-            if self.network.activated:
-                delta = max(self.t_cycle, dtms)
-                self.framerate = int(1000.0 / delta)
-            else:
-                self.framerate = 0
-
-            if(dtms < self.t_cycle):
-                time.sleep((self.t_cycle - dtms) / 1000.0)
+            self.framerate = int(1000.0 / max(dtms, 1))
+            self.pipeline.notify('camera')  # detection ready
 
     def runOnce(self):
         if not self.network.activated:
             self.network.predict()
+            self.pipeline.notify('camera')
@@ -1,11 +1,15 @@
+import hashlib
+import os
+import time
+
 import h5py
-from keras.optimizers import Adam
+from keras.models import load_model
 
 from Net.Keras.models.keras_ssd300 import ssd_300
 from Net.Keras.models.keras_ssd512 import ssd_512
 
 
-def create_model(file, ssd_loss, n_classes):
+def create_model(file, n_classes):
 
     h5_file = h5py.File(file, 'r')
 
@@ -70,14 +74,59 @@ def create_model(file, ssd_loss, n_classes):
 
     model.load_weights(file, by_name=True)
 
-    adam = Adam(lr=0.001, beta_1=0.9, beta_2=0.999, epsilon=1e-08, decay=5e-04)
+    return model  # inference only: the optimizer is never compiled
+
+
+def file_digest(file, chunk_size=1 << 20):
+    ''' Returns the SHA-1 of a file. '''
+    digest = hashlib.sha1()
+    with open(file, 'rb') as stream:
+        for chunk in iter(lambda: stream.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def cached_model_path(file, digest, n_classes, suffix='.h5'):
+    ''' Returns the path of the full model with n_classes converted from a weights file with the given SHA-1. '''
+    return '%s_full_%d_%s%s' % (file.split('.h5')[0], n_classes, digest[:16], suffix)
 
-    model.compile(optimizer=adam, loss=ssd_loss.compute_loss)
 
-    # Save the full model on a complete HDF5 file.
+def load_cached_model(file, n_classes, custom_objects):
+    '''
+    Loads the full model converted from a weights-only file. The conversion is done once
+    and saved (without optimizer) next to the weights, keyed by the SHA-1 of the weights and
+    the number of classes: the next runs load it directly, and a modified weights file or
+    another dataset gets a new conversion.
 
-    full_model_name = file.split('.h5')[0] + '_full' + '.h5'
-    model.save(full_model_name)
+    Arguments:
+        file (str): weights-only HDF5 file.
+        n_classes (int): number of classes of the model.
+        custom_objects (dict): custom layers of the SSD models.
 
+    Returns:
+        The Keras model (not compiled).
+    '''
+    start_time = time.time()
+    digest = file_digest(file)
+    model_path = cached_model_path(file, digest, n_classes)
+    if os.path.isfile(model_path):
+        model = load_model(model_path, custom_objects=custom_objects, compile=False)
+        load_time = time.time() - start_time
+        with h5py.File(model_path, 'r') as h5_file:
+            conversion_time = float(h5_file.attrs.get('conversion_time', 0.0))
+        print('Converted model loaded from %s in %.2f s (conversion took %.2f s, %.2f s saved).' % (
+            model_path, load_time, conversion_time, conversion_time - load_time))
+        return model
 
-    return model
\ No newline at end of file
+    model = create_model(file, n_classes)
+    conversion_time = time.time() - start_time
+    # never leave a truncated model in the cache (the .h5 extension keeps the HDF5 format of model.save)
+    temp_path = cached_model_path(file, digest, n_classes, '.tmp.h5')
+    model.save(temp_path, include_optimizer=False)
+    with h5py.File(temp_path, 'a') as h5_file:
+        h5_file.attrs['source_sha1'] = digest
+        h5_file.attrs['n_classes'] = n_classes
+        h5_file.attrs['conversion_time'] = conversion_time
+    os.rename(temp_path, model_path)
+    print('Weights converted in %.2f s, full model saved to %s.' % (conversion_time, model_path))
+    return model
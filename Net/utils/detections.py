@@ -0,0 +1,112 @@
+'''
+Compact container of detections shared by the networks, the tracker and the loggers.
+
+Boxes are always stored in pixels as contiguous float32 rows in the canonical
+corners order (xmin, ymin, xmax, ymax), whatever the framework that produced them.
+'''
+
+import numpy as np
+
+CLASS_ID_DTYPE = np.int32  # class ids of the containers and of the records
+
+DETECTION_DTYPE = np.dtype([('class_id', CLASS_ID_DTYPE),
+                            ('score', np.float32),
+                            ('xmin', np.float32),
+                            ('ymin', np.float32),
+                            ('xmax', np.float32),
+                            ('ymax', np.float32)])
+
+
+class Detections:
+
+    def __init__(self, boxes, class_ids, scores, label_table, track_ids=None):
+        '''
+        Arguments:
+            boxes (array): `(n, 4)` boxes in (xmin, ymin, xmax, ymax) order.
+            class_ids (array): `(n, )` class ids, indices of `label_table`.
+            scores (array): `(n, )` confidence scores.
+            label_table (array): class names indexed by class id (shared, never copied).
+            track_ids (array, optional): `(n, )` ids of the tracks of the detections.
+        '''
+        self.boxes = np.ascontiguousarray(boxes, dtype=np.float32).reshape(-1, 4)
+        self.class_ids = np.asarray(class_ids, dtype=CLASS_ID_DTYPE)
+        self.scores = np.asarray(scores, dtype=np.float32)
+        self.label_table = label_table
+        self.track_ids = None if track_ids is None else np.asarray(track_ids, dtype=np.int32)
+
+    @classmethod
+    def empty(cls, label_table):
+        ''' Returns a container without detections. '''
+        return cls(np.zeros((0, 4)), np.zeros(0), np.zeros(0), label_table)
+
+    @classmethod
+    def fromRecords(cls, records, label_table):
+        ''' Builds the container from an array of DETECTION_DTYPE records. '''
+        boxes = np.stack([records['xmin'], records['ymin'], records['xmax'], records['ymax']], axis=1)
+        return cls(boxes, records['class_id'], records['score'], label_table)
+
+    @classmethod
+    def concatenate(cls, detections, label_table):
+        ''' Joins several containers (track ids are dropped). '''
+        if not detections:
+            return cls.empty(label_table)
+        return cls(np.concatenate([detection.boxes for detection in detections]),
+                   np.concatenate([detection.class_ids for detection in detections]),
+                   np.concatenate([detection.scores for detection in detections]), label_table)
+
+    def toRecords(self):
+        ''' Returns the detections as an array of DETECTION_DTYPE records. '''
+        records = np.empty(len(self), dtype=DETECTION_DTYPE)
+        records['class_id'] = self.class_ids
+        records['score'] = self.scores
+        records['xmin'] = self.boxes[:, 0]
+        records['ymin'] = self.boxes[:, 1]
+        records['xmax'] = self.boxes[:, 2]
+        records['ymax'] = self.boxes[:, 3]
+        return records
+
+    def __len__(self):
+        return len(self.scores)
+
+    def __getitem__(self, index):
+        ''' Selects detections. Slices return views of the arrays (no copy). '''
+        if isinstance(index, (int, np.integer)):
+            index = slice(index, index + 1 if index != -1 else None)
+        return Detections(self.boxes[index], self.class_ids[index], self.scores[index], self.label_table,
+                          None if self.track_ids is None else self.track_ids[index])
+
+    @property
+    def labels(self):
+        ''' Class names of the detections. '''
+        return self.label_table[self.class_ids]
+
+    def scaled(self, scale_x, scale_y):
+        ''' Returns the boxes rescaled by the given factors. '''
+        return self.boxes * np.array([scale_x, scale_y, scale_x, scale_y], dtype=np.float32)
+
+    def transformed(self, scale_x, scale_y, offset_x, offset_y):
+        ''' Returns the detections with the boxes rescaled and then shifted (e.g. from a crop to its image). '''
+        boxes = self.scaled(scale_x, scale_y) + np.array([offset_x, offset_y, offset_x, offset_y], dtype=np.float32)
+        return Detections(boxes, self.class_ids, self.scores, self.label_table, self.track_ids)
+
+    def intBoxes(self):
+        ''' Returns the boxes as integer pixel coordinates. '''
+        return self.boxes.astype(int)
+
+    def logEntries(self, frame, image_scale, score=None):
+        '''
+        Returns the log entries of the detections: [frame, class, score, (xmin, ymin), (xmax, ymax)],
+        followed by the track id if any. Boxes are rescaled to the original image size.
+        A fixed score can be given (trackers have no confidence).
+        '''
+        boxes = self.scaled(image_scale[0], image_scale[1]).astype(int)
+        labels = self.labels
+        entries = []
+        for i in range(len(self)):
+            class_no_spaces = labels[i].replace(" ", "")  # to allow the use of metrics calculation utility
+            entry = [frame, class_no_spaces, str(self.scores[i]) if score is None else score,
+                     (int(boxes[i, 0]), int(boxes[i, 1])), (int(boxes[i, 2]), int(boxes[i, 3]))]
+            if self.track_ids is not None:
+                entry.append(int(self.track_ids[i]))
+            entries.append(entry)
+        return entries
@@ -0,0 +1,71 @@
+'''
+Compiled label maps: the class names and the box colors of a label map as dense
+arrays indexed by class id, cached next to the label map in a small `.npz` file.
+
+The cache is rebuilt when the label map is modified (its path and mtime are stored
+in the cache), so the protobuf text is only parsed once.
+'''
+
+import os
+
+import numpy as np
+
+from Net.utils import label_map_util
+
+
+def compile_label_map(path, colors=label_map_util.COLORS):
+    '''
+    Parses a label map.
+
+    Arguments:
+        path (str): `.pbtxt` label map.
+        colors (list): colors assigned cyclically to the classes, in order of id.
+
+    Returns:
+        The class names (an empty string for the unused ids) and the `(n, 3)` colors,
+        both indexed by class id.
+    '''
+    label_map = label_map_util.load_labelmap(path)
+    categories = label_map_util.convert_label_map_to_categories(label_map, max_num_classes=999999)
+    ids = np.array([category['id'] for category in categories], dtype=np.int64)
+    size = ids.max() + 1 if len(ids) else 1
+    names = np.zeros(size, dtype=object)
+    names[:] = ''
+    names[ids] = [str(category['name']) for category in categories]
+    color_table = np.zeros((size, 3), dtype=np.uint8)
+    color_table[np.sort(ids)] = np.resize(np.array(colors, dtype=np.uint8), (len(ids), 3))
+    return names, color_table
+
+
+def cache_path(path):
+    ''' Returns the path of the compiled cache of a label map. '''
+    return path + '.npz'
+
+
+def load_label_map(path, colors=label_map_util.COLORS):
+    '''
+    Loads the compiled label map, from the cache when it is up to date.
+
+    Arguments:
+        path (str): `.pbtxt` label map.
+        colors (list): colors assigned cyclically to the classes, in order of id.
+
+    Returns:
+        The label table (class names as an array of objects, as expected by `Detections`)
+        and the color table (`(n, 3)` uint8), both indexed by class id.
+    '''
+    mtime = os.path.getmtime(path)
+    try:
+        with np.load(cache_path(path)) as cache:
+            if str(cache['path']) == os.path.abspath(path) and float(cache['mtime']) == mtime:
+                return cache['names'].astype(str).astype(object), cache['colors']
+    except (IOError, OSError, KeyError, ValueError):  # no cache or unreadable: compile again
+        pass
+
+    names, color_table = compile_label_map(path, colors)
+    try:
+        np.savez(cache_path(path), path=os.path.abspath(path), mtime=mtime,
+                 names=names.astype(str), colors=color_table)
+    except (IOError, OSError):  # read-only folder: only the cache is lost
+        pass
+    return names, color_table
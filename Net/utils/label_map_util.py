@@ -111,7 +111,6 @@ COLORS = [(0, 255, 0),
 
 import logging
 
-import tensorflow as tf
 from google.protobuf import text_format
 from ..protos import string_int_label_map_pb2
 
@@ -175,7 +174,7 @@ def convert_label_map_to_categories(label_map,
     categories: a list of dictionaries representing all possible categories.
   """
   categories = []
-  list_of_ids_already_added = []
+  ids_already_added = set()
   if not label_map:
     label_id_offset = 1
     for class_id in range(max_num_classes):
@@ -193,8 +192,8 @@ def convert_label_map_to_categories(label_map,
       name = item.display_name
     else:
       name = item.name
-    if item.id not in list_of_ids_already_added:
-      list_of_ids_already_added.append(item.id)
+    if item.id not in ids_already_added:
+      ids_already_added.add(item.id)
       categories.append({'id': item.id, 'name': name})
   return categories
 
@@ -207,7 +206,7 @@ def load_labelmap(path):
   Returns:
     a StringIntLabelMapProto
   """
-  with tf.gfile.GFile(path, 'r') as fid:
+  with open(path, 'r') as fid:
     label_map_string = fid.read()
     label_map = string_int_label_map_pb2.StringIntLabelMap()
     try:
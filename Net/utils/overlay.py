@@ -0,0 +1,67 @@
+'''
+Drawing of the detections of the networks on the images.
+
+Rendering is decoupled from inference: the networks only keep the frame and its
+`Detections`, and the overlay is drawn when a consumer (the GUI or the image
+writer) asks for the pixels.
+'''
+
+import numpy as np
+import cv2
+
+from Pipeline import instrumentation
+
+
+class OverlayRenderer:
+
+    def __init__(self, colors, caption=None, font=cv2.FONT_HERSHEY_SIMPLEX, scale=0.5):
+        '''
+        Arguments:
+            colors (array): `(n, 3)` colors of the boxes indexed by class id.
+            caption (str, optional): text written on the top of the images with detections.
+            font (int): OpenCV font of the labels.
+            scale (float): scale of the font.
+        '''
+        self.colors = colors
+        self.caption = caption
+        self.font = font
+        self.scale = scale
+        self.text_sizes = {}  # label text -> (size, base), labels repeat a lot between frames
+
+    def textSize(self, text):
+        ''' Returns the size and the baseline of a text, computed once per text. '''
+        if text not in self.text_sizes:
+            self.text_sizes[text] = cv2.getTextSize(text, self.font, self.scale, 2)
+        return self.text_sizes[text]
+
+    def render(self, image, detection):
+        ''' Returns a copy of the image with the boxes, labels and scores of the detections drawn on it. '''
+        with instrumentation.timer('render'):
+            return self.draw(np.copy(image), detection)
+
+    def draw(self, image_np, detection):
+        ''' Draws the detections on the image. '''
+        detection_boxes = detection.intBoxes()
+        detection_classes = detection.labels
+        detection_colors = self.colors[detection.class_ids].tolist()  # one lookup for every box
+        detection_scores = detection.scores
+
+        for index in range(len(detection)):
+            _class = detection_classes[index]
+            xmin, ymin, xmax, ymax = detection_boxes[index]
+            cv2.rectangle(image_np, (xmin, ymin), (xmax, ymax), tuple(detection_colors[index]), 3)
+
+            label = "{0} ({1} %)".format(_class, int(detection_scores[index] * 100))
+            [size, base] = self.textSize(label)
+
+            points = np.array([[[xmin, ymin + base],
+                                [xmin, ymin - size[1]],
+                                [xmin + size[0], ymin - size[1]],
+                                [xmin + size[0], ymin + base]]], dtype=np.int32)
+            cv2.fillPoly(image_np, points, (0, 0, 0))
+            cv2.putText(image_np, label, (xmin, ymin), self.font, self.scale, (255, 255, 255), 2)
+
+        if self.caption and len(detection):
+            cv2.putText(image_np, self.caption, (150, 20), self.font, self.scale, (255, 0, 0), 2)
+
+        return image_np
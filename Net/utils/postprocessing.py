@@ -0,0 +1,99 @@
+'''
+Column-wise post-processing of the raw outputs of the networks.
+
+Both backends turn their predictions into the same `Detections` container,
+with the boxes in pixels of the input image.
+'''
+
+import numpy as np
+
+from Net.Keras.bounding_box_utils.bounding_box_utils import iou
+from Net.utils.detections import Detections
+
+
+def keras_detections(y_pred, confidence_threshold, label_table, width_factor=1.0, height_factor=1.0):
+    '''
+    Thresholds the decoded predictions of a Keras SSD model for one image.
+
+    Arguments:
+        y_pred (array): A 2D Numpy array of shape `(n, 6)` with rows
+            `(class_id, score, xmin, ymin, xmax, ymax)`.
+        confidence_threshold (float): Minimum score of the kept detections.
+        label_table (array): Class names indexed by class id.
+        width_factor, height_factor (float): Factors to rescale the boxes.
+
+    Returns:
+        A `Detections` container.
+    '''
+    rows = y_pred[y_pred[:, 1] > confidence_threshold]
+    boxes = rows[:, 2:6] * np.array([width_factor, height_factor, width_factor, height_factor])
+    return Detections(boxes, rows[:, 0], rows[:, 1], label_table)
+
+
+def keras_scale_factors(image_shape, model_height, model_width):
+    '''
+    Returns the factors which rescale the boxes predicted by a Keras model to the
+    image it was fed with (every image is resized to the input size of the model).
+
+    Arguments:
+        image_shape (tuple): shape of the image, `(height, width, channels)`.
+        model_height, model_width (int): input size of the model.
+
+    Returns:
+        The width and height factors.
+    '''
+    return float(image_shape[1]) / model_width, float(image_shape[0]) / model_height
+
+
+def tensorflow_detections(boxes, scores, classes, confidence_threshold, label_table, height, width):
+    '''
+    Thresholds the outputs of a TensorFlow Object Detection API model for one image.
+
+    Arguments:
+        boxes (array): A 2D Numpy array of shape `(n, 4)` with normalized
+            `(ymin, xmin, ymax, xmax)` boxes.
+        scores (array): A 1D Numpy array of shape `(n, )`.
+        classes (array): A 1D Numpy array of shape `(n, )` with the class ids.
+        confidence_threshold (float): Minimum score of the kept detections.
+        label_table (array): Class names indexed by class id.
+        height, width (int): Size of the input image in pixels.
+
+    Returns:
+        A `Detections` container.
+    '''
+    keep = scores > confidence_threshold
+    boxes = boxes[keep][:, [1, 0, 3, 2]] * np.array([width, height, width, height])
+    return Detections(boxes, classes[keep], scores[keep], label_table)
+
+
+def non_max_suppression(detection, iou_threshold=0.5):
+    '''
+    Removes the duplicated detections of an object (e.g. found in several crops of
+    the same image): taken by decreasing score, a detection is dropped if it overlaps
+    a kept detection of the same class by more than the threshold.
+
+    Arguments:
+        detection (Detections): detections of one image.
+        iou_threshold (float): maximum IoU between two kept detections of the same class.
+
+    Returns:
+        A `Detections` container with the kept detections, by decreasing score.
+    '''
+    n = len(detection)
+    if n < 2:
+        return detection
+    order = np.argsort(-detection.scores, kind='mergesort')
+    detection = detection[order]
+    # IoU of every pair (i, j), i < j, in one vectorised call
+    rows, cols = np.triu_indices(n, k=1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        overlaps = np.nan_to_num(iou(detection.boxes[rows], detection.boxes[cols], coords='corners'))
+    same_class = detection.class_ids[rows] == detection.class_ids[cols]
+    overlapping = np.zeros((n, n), dtype=bool)
+    overlapping[rows, cols] = same_class & (overlaps > iou_threshold)
+
+    keep = np.ones(n, dtype=bool)
+    for i in np.flatnonzero(overlapping.any(axis=1)):  # only the detections which can suppress others
+        if keep[i]:
+            keep &= ~overlapping[i]
+    return detection[keep]
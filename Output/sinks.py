@@ -0,0 +1,174 @@
+#
+# Created on Oct, 2026
+#
+# Output sinks of the images with the results when the GUI is off. The camera
+# only queues the frames: the color conversion, the encoding and the disk
+# writes are done by background workers, either as one JPEG file per frame or
+# appended to a single video file. The queue is bounded, so a slow disk slows
+# down the camera instead of filling the memory. A failed write stops the
+# writes (the workers keep draining the queue) and is raised by the next write.
+#
+
+import os
+import threading
+
+import cv2
+
+try:
+    import queue
+except ImportError:  # Python 2
+    import Queue as queue
+
+from Output.threadwriter import ThreadWriter
+from Pipeline import instrumentation
+
+SINKS = ('jpeg', 'video')
+
+
+class OutputSink:
+
+    def __init__(self, workers, queue_size):
+        ''' OutputSink class queues the frames written by worker threads (writeFrame of the subclasses). '''
+        self.queue = queue.Queue(queue_size)
+        self.queue_size = queue_size
+        self.lock = threading.Lock()
+        self.closed = False
+        self.error = None  # first failure of the workers
+        # metrics
+        self.queued = 0
+        self.written = 0
+        self.bytes_written = 0
+        self.blocked = 0  # frames which had to wait for a free place in the queue
+        self.high_water = 0
+        self.start_time = instrumentation.clock()
+
+        self.t_writers = [ThreadWriter(self) for _ in range(workers)]
+        for t_writer in self.t_writers:
+            t_writer.setDaemon(True)
+            t_writer.start()
+
+    def write(self, im, frame_number, to_bgr=True):
+        ''' Queues an output image (RGB unless to_bgr is False). The image must not be modified afterwards. '''
+        if self.closed:
+            return
+        self.checkError()
+        if self.queue.full():
+            self.blocked += 1
+        self.queue.put((im, frame_number, to_bgr))  # blocks while the queue is full
+        with self.lock:
+            self.queued += 1
+            self.high_water = max(self.high_water, self.queue.qsize())
+
+    def fail(self, frame_number, error):
+        ''' Records the failure of a worker (the following frames are dropped). '''
+        with self.lock:
+            if self.error is None:
+                self.error = 'frame %d: %s' % (frame_number, error)
+
+    def checkError(self):
+        ''' Raises the failure of the workers, if any. '''
+        if self.error is not None:
+            raise IOError('Output sink failed (%s).' % self.error)
+
+    def countWritten(self, size):
+        ''' Counts a frame written to disk with its size in bytes. '''
+        with self.lock:
+            self.written += 1
+            self.bytes_written += size
+
+    def close(self):
+        ''' Writes the queued frames and stops the workers. Raises the failure of the workers, if any. '''
+        if self.closed:
+            return
+        self.closed = True
+        for _ in self.t_writers:
+            self.queue.put(None)
+        for t_writer in self.t_writers:
+            t_writer.join()
+        self.release()
+        print(self.report())
+        self.checkError()
+
+    def release(self):
+        ''' Releases the resources of the sink once every frame is written. '''
+        pass
+
+    def getMetrics(self):
+        ''' Returns the queue occupancy and the throughput of the sink. '''
+        with self.lock:
+            elapsed = max(instrumentation.clock() - self.start_time, 1e-6)
+            return {'queue_size': self.queue_size,
+                    'occupancy': self.queue.qsize(),
+                    'high_water': self.high_water,
+                    'queued': self.queued,
+                    'written': self.written,
+                    'blocked': self.blocked,
+                    'bytes': self.bytes_written,
+                    'fps': self.written / elapsed,
+                    'mb_per_second': self.bytes_written / elapsed / 2 ** 20}
+
+    def report(self):
+        ''' Returns a summary of the metrics. '''
+        metrics = self.getMetrics()
+        return ('Output: %d frames written (%.1f fps), %.1f MB (%.2f MB/s), %d frames waited for the queue '
+                '(max %d of %d).' % (metrics['written'], metrics['fps'], metrics['bytes'] / 2.0 ** 20,
+                                     metrics['mb_per_second'], metrics['blocked'], metrics['high_water'],
+                                     metrics['queue_size']))
+
+
+class JpegSink(OutputSink):
+
+    def __init__(self, folder='images_results', workers=2, queue_size=64, quality=95):
+        ''' JpegSink class writes every frame to <folder>/<frame number>.jpg with several workers. '''
+        self.folder = folder
+        self.params = [int(cv2.IMWRITE_JPEG_QUALITY), quality]
+        OutputSink.__init__(self, workers, queue_size)
+
+    def writeFrame(self, im, frame_number, to_bgr):
+        ''' Encodes a frame to JPEG and writes it. '''
+        with instrumentation.timer('output_encode'):
+            if to_bgr:
+                im = cv2.cvtColor(im, cv2.COLOR_BGR2RGB)
+            _, data = cv2.imencode('.jpg', im, self.params)
+        with instrumentation.timer('output_write'):
+            with open(os.path.join(self.folder, str(frame_number) + '.jpg'), 'wb') as image_file:
+                image_file.write(data.tobytes())
+        self.countWritten(data.size)
+
+
+class VideoSink(OutputSink):
+
+    def __init__(self, path='images_results/results.avi', fps=25.0, codec='MJPG', queue_size=64):
+        ''' VideoSink class appends the frames to a single video file (one worker keeps the order). '''
+        if os.path.isdir(path):
+            path = os.path.join(path, 'results.avi')
+        self.path = path
+        self.fps = fps
+        self.fourcc = cv2.VideoWriter_fourcc(*codec)
+        self.writer = None  # opened with the size of the first frame
+        self.file_size = 0
+        OutputSink.__init__(self, 1, queue_size)
+
+    def writeFrame(self, im, frame_number, to_bgr):
+        ''' Encodes a frame in the video. '''
+        with instrumentation.timer('output_encode'):
+            if to_bgr:
+                im = cv2.cvtColor(im, cv2.COLOR_BGR2RGB)
+            if self.writer is None:
+                self.writer = cv2.VideoWriter(self.path, self.fourcc, self.fps, (im.shape[1], im.shape[0]))
+            self.writer.write(im)
+        file_size = os.path.getsize(self.path) if os.path.isfile(self.path) else 0  # buffered by OpenCV
+        self.countWritten(file_size - self.file_size)
+        self.file_size = file_size
+
+    def release(self):
+        ''' Closes the video file. '''
+        if self.writer is not None:
+            self.writer.release()
+            file_size = os.path.getsize(self.path)
+            self.bytes_written += file_size - self.file_size
+            self.file_size = file_size
+
+    def report(self):
+        ''' Returns a summary of the metrics with the path of the video file. '''
+        return OutputSink.report(self) + ' Video: %s.' % self.path
@@ -0,0 +1,28 @@
+#
+# Created on Oct, 2026
+#
+# Threading class which encodes and writes the frames queued in an output sink.
+#
+
+import threading
+
+
+class ThreadWriter(threading.Thread):
+
+    def __init__(self, sink):
+        ''' Threading class for the output sinks. '''
+        self.sink = sink
+        threading.Thread.__init__(self)
+
+    def run(self):
+        ''' Writes the queued frames until the sink is closed. '''
+        while True:
+            item = self.sink.queue.get()
+            if item is None:  # closed: every frame queued before has been written
+                break
+            if self.sink.error is not None:  # failed: drop the frames, never block the camera
+                continue
+            try:
+                self.sink.writeFrame(*item)
+            except Exception as error:  # disk full, unwritable folder, codec...
+                self.sink.fail(item[1], error)
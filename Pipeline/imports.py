@@ -0,0 +1,62 @@
+#
+# Created on Oct, 2026
+#
+# Lazy imports of the optional backends (ROS, dlib, TensorFlow, Keras, Qt):
+# a module is only imported when the configuration uses it, and the time
+# spent importing it is recorded for the startup report.
+#
+# Usage:
+#   dlib = imports.lazy('dlib')  # nothing imported yet
+#   dlib.correlation_tracker()  # imported (and timed) here
+#   print(imports.report())
+#
+
+import importlib
+import sys
+import threading
+from collections import OrderedDict
+
+from Pipeline.instrumentation import clock
+
+timings = OrderedDict()  # module name -> import time (s), in import order
+lock = threading.Lock()
+
+
+def load(name):
+    ''' Imports a module (timed the first time). '''
+    module = sys.modules.get(name)
+    if module is not None:
+        return module
+    with lock:  # two threads could need the same backend
+        start_time = clock()
+        module = importlib.import_module(name)
+        if name not in timings:
+            timings[name] = clock() - start_time
+    return module
+
+
+class LazyModule:
+
+    def __init__(self, name):
+        ''' LazyModule class stands for a module until one of its attributes is used. '''
+        self.module_name = name
+        self.module = None
+
+    def __getattr__(self, attribute):
+        if self.module is None:
+            self.module = load(self.module_name)
+        return getattr(self.module, attribute)
+
+
+def lazy(name):
+    ''' Returns a placeholder of a module, imported on first use. '''
+    return LazyModule(name)
+
+
+def report():
+    ''' Returns the import times of the backends (ms). '''
+    lines = ['%-32s%10s' % ('import', 'ms')]
+    for name, duration in timings.items():
+        lines.append('%-32s%10.1f' % (name, duration * 1000))
+    lines.append('%-32s%10.1f' % ('total', sum(timings.values()) * 1000))
+    return '\n'.join(lines)
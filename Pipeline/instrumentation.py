@@ -0,0 +1,185 @@
+#
+# Created on Oct, 2026
+#
+# Latency and throughput instrumentation shared by every stage of the pipeline.
+# Durations are measured with a monotonic clock and recorded in log-linear
+# (HDR-style) histograms: constant memory and ~1% relative error whatever
+# the number of samples, so the percentiles of long runs stay exact enough.
+#
+# Usage:
+#   with instrumentation.timer('inference'):
+#       ...
+#   print(instrumentation.report())
+#
+
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+try:
+    clock = time.monotonic
+except AttributeError:  # Python 2: no monotonic clock in the standard library
+    clock = time.time
+
+STAGES = ('decode', 'resize', 'motion', 'tile_crop', 'preprocess', 'inference', 'postprocessing', 'tile_detect',
+          'tile_merge', 'render', 'tracker_init', 'tracker_update', 'output_encode', 'output_write')
+PERCENTILES = (50, 95, 99)
+
+
+class Histogram:
+
+    SUB_BUCKET_BITS = 7  # 128 linear sub-buckets per power of two
+    MAX_VALUE = 3600 * 10 ** 6  # 1 hour, in microseconds (larger values are clamped)
+
+    def __init__(self):
+        ''' Histogram class counts values in microseconds in log-linear buckets. '''
+        self.half = 1 << (self.SUB_BUCKET_BITS - 1)
+        self.counts = [0] * (self.index(self.MAX_VALUE) + 1)
+        self.total_count = 0
+        self.total = 0
+        self.min = None
+        self.max = 0
+
+    def index(self, value):
+        ''' Returns the bucket of a value: exact below 128, 64 buckets per power of two above. '''
+        if value < 2 * self.half:
+            return value
+        shift = value.bit_length() - self.SUB_BUCKET_BITS
+        return 2 * self.half + (shift - 1) * self.half + ((value >> shift) - self.half)
+
+    def bucketValue(self, index):
+        ''' Returns the value in the middle of a bucket. '''
+        if index < 2 * self.half:
+            return index
+        shift = (index - 2 * self.half) // self.half + 1
+        low = ((index - 2 * self.half) % self.half + self.half) << shift
+        return low + ((1 << shift) - 1) // 2
+
+    def record(self, value):
+        ''' Counts a value (int, microseconds). '''
+        value = min(max(int(value), 0), self.MAX_VALUE)
+        self.counts[self.index(value)] += 1
+        self.total_count += 1
+        self.total += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = max(self.max, value)
+
+    def percentile(self, percent):
+        ''' Returns the value below which the given percent of the values are. '''
+        if not self.total_count:
+            return 0
+        rank = max(1, int(round(percent / 100.0 * self.total_count)))
+        accumulated = 0
+        for index, count in enumerate(self.counts):
+            accumulated += count
+            if accumulated >= rank:
+                return min(self.bucketValue(index), self.max)
+        return self.max
+
+
+class StageStats:
+
+    def __init__(self, name):
+        ''' StageStats class keeps the latency histogram and the throughput of a stage. '''
+        self.name = name
+        self.histogram = Histogram()
+        self.first_time = None
+        self.last_time = None
+        self.lock = threading.Lock()
+
+    def record(self, seconds):
+        ''' Records one execution of the stage that took the given seconds. '''
+        now = clock()
+        with self.lock:
+            self.histogram.record(seconds * 10 ** 6)
+            if self.first_time is None:
+                self.first_time = now - seconds
+            self.last_time = now
+
+    def getSummary(self):
+        ''' Returns the count, throughput (per second) and latencies (ms) of the stage. '''
+        with self.lock:
+            histogram = self.histogram
+            elapsed = (self.last_time - self.first_time) if self.first_time is not None else 0
+            summary = OrderedDict()
+            summary['count'] = histogram.total_count
+            summary['rate'] = histogram.total_count / elapsed if elapsed > 0 else 0.0
+            summary['mean'] = histogram.total / 1000.0 / histogram.total_count if histogram.total_count else 0.0
+            for percent in PERCENTILES:
+                summary['p%d' % percent] = histogram.percentile(percent) / 1000.0
+            summary['max'] = histogram.max / 1000.0
+            return summary
+
+
+class Instrumentation:
+
+    def __init__(self):
+        ''' Instrumentation class keeps the statistics of every stage. '''
+        self.stages = OrderedDict((name, StageStats(name)) for name in STAGES)
+        self.listeners = []  # functions called with (name, start, duration) of every timed block
+        self.lock = threading.Lock()
+
+    def getStage(self, name):
+        ''' Returns the statistics of a stage, created on first use. '''
+        stage = self.stages.get(name)
+        if stage is None:
+            with self.lock:
+                stage = self.stages.setdefault(name, StageStats(name))
+        return stage
+
+    def record(self, name, seconds):
+        ''' Records a duration of a stage (which has just finished). '''
+        self.getStage(name).record(seconds)
+        for listener in self.listeners:
+            listener(name, clock() - seconds, seconds)
+
+    def addListener(self, listener):
+        ''' Adds a function called with the name, start time and duration of every timed block. '''
+        self.listeners = self.listeners + [listener]
+
+    def removeListener(self, listener):
+        ''' Removes a listener of the timed blocks. '''
+        self.listeners = [l for l in self.listeners if l != listener]
+
+    @contextmanager
+    def timer(self, name):
+        ''' Context manager which records the duration of its block. '''
+        start = clock()
+        try:
+            yield
+        finally:
+            self.record(name, clock() - start)
+
+    def getSummaries(self):
+        ''' Returns the summaries of the stages with samples. '''
+        return OrderedDict((name, stage.getSummary()) for name, stage in list(self.stages.items())
+                           if stage.histogram.total_count)
+
+    def report(self):
+        ''' Returns a table with the latency percentiles (ms) and the throughput of every stage. '''
+        columns = ['count', 'rate'] + ['p%d' % percent for percent in PERCENTILES] + ['max']
+        lines = ['%-16s' % 'stage' + ''.join('%10s' % column for column in columns)]
+        for name, summary in self.getSummaries().items():
+            lines.append('%-16s%10d' % (name, summary['count']) +
+                         ''.join('%10.2f' % summary[column] for column in columns[1:]))
+        return '\n'.join(lines)
+
+
+# instrumentation of the whole application
+registry = Instrumentation()
+
+
+def record(name, seconds):
+    ''' Records a duration of a stage in the application registry. '''
+    registry.record(name, seconds)
+
+
+def timer(name):
+    ''' Times a block in the application registry. '''
+    return registry.timer(name)
+
+
+def report():
+    ''' Returns the report of the application registry. '''
+    return registry.report()
@@ -0,0 +1,174 @@
+#
+# Created on Oct, 2026
+#
+# Offline runner for recorded sources (local videos and images).
+# Reads every frame as fast as possible, runs the network on keyframes and the
+# tracker on the frames between them, without any real-time pacing.
+# Keyframes are read ahead and detected in batches. With a scheduler, the
+# keyframes are chosen by the changes of the scene instead of a fixed interval
+# (the lost tracks do not trigger detections offline).
+# With ROI or tiled detection, the keyframes are detected at the resolution of
+# the source one segment at a time (the regions come from the tracks of the
+# segment, the batch is made of the tiles of the keyframe).
+#
+
+import time
+
+from Pipeline import tracing
+
+
+class OfflineRunner:
+
+    def __init__(self, cam, network, tracker, keyframe_interval, batch_size, scheduler=None, roi=None,
+                 tiler=None):
+        ''' OfflineRunner class processes a whole recorded source without wall-clock pacing. '''
+        if keyframe_interval < 2:
+            raise SystemExit('KeyframeInterval must be at least 2 (one keyframe and one tracked frame).')
+        self.cam = cam
+        self.network = network
+        self.tracker = tracker
+        self.keyframe_interval = keyframe_interval
+        self.batch_size = max(batch_size, 1)
+        self.scheduler = scheduler
+        if scheduler is not None:
+            scheduler.min_interval = max(scheduler.min_interval, 2)
+        self.roi = roi
+        self.tiler = tiler
+        if roi is not None or tiler is not None:
+            cam.keep_native = True
+        self.tracker.realtime = False  # never skip frames
+        self.frames_processed = 0
+
+    def readFrame(self):
+        ''' Returns the next frame and its number (None when the source is exhausted). '''
+        im = self.cam.getImage()
+        self.cam.frame_tag = []  # frame numbers are handled by the runner
+        if im is None:
+            return None, None
+        self.frames_processed += 1
+        return im, self.cam.frame_counter
+
+    def isKeyframe(self, frames):
+        ''' Checks if the last frame read has to be detected. '''
+        if self.scheduler is None:
+            return len(frames) >= self.keyframe_interval
+        self.scheduler.observe(frames[-1])
+        # motion and interval only: the segments are read before they are tracked (ahead with batches),
+        # so the lost tracks of the tracker would belong to an earlier segment
+        if self.scheduler.shouldDetect():
+            self.scheduler.detected(frames[-1])
+            return True
+        return False
+
+    def readSegment(self):
+        ''' Reads the frames until the next keyframe (included). '''
+        frames = []
+        tags = []
+        while True:
+            im, tag = self.readFrame()
+            if im is None:
+                break
+            frames.append(im)
+            tags.append(tag)
+            if self.isKeyframe(frames):
+                break
+        return frames, tags
+
+    def readSegments(self):
+        ''' Reads the segments whose keyframes are detected in the same batch. '''
+        segments = []
+        while len(segments) < self.batch_size:
+            frames, tags = self.readSegment()
+            if not frames:
+                break
+            segments.append((frames, tags))
+        return segments
+
+    def track(self, frames, tags, detection):
+        ''' Tracks a segment with the detection of the previous keyframe.
+        The whole segment is handed to the tracker as in live mode, but the tracker stops one frame
+        before the end of its buffer (the first image counts twice), so the last frame (next keyframe)
+        is neither tracked nor logged by the tracker: it is only logged by the network. '''
+        self.tracker.setInputDetection(detection, True)
+        self.tracker.setInputLabel(list(detection.labels))
+        self.tracker.setColorList(self.network.getColorList())
+        self.tracker.setBuffer(frames)
+        self.tracker.setFrameTags(tags)
+        self.tracker.activated = True
+        while self.tracker.activated:
+            if self.tracker.hasWork():
+                self.tracker.track()
+            self.tracker.getOutputImage()
+            self.tracker.checkProgress()
+
+    def runBatches(self, detection):
+        ''' Processes the segments, their keyframes detected in batches. '''
+        segments = self.readSegments()
+        while segments:
+            keyframes = [frames[-1] for frames, _ in segments]
+            keyframe_tags = [tags[-1] for _, tags in segments]
+            with tracing.span('DetectionNetwork.predict_batch', frame=keyframe_tags[0], batch=len(keyframes)):
+                detections = self.network.predict_batch(keyframes, keyframe_tags)
+            for (frames, tags), keyframe_detection in zip(segments, detections):
+                if len(frames) > 1:
+                    with tracing.span('OfflineRunner.track', frame=tags[0], frames=len(frames) - 1):
+                        self.track(frames, tags, detection)
+                detection = keyframe_detection
+            segments = self.readSegments()
+
+    def detectFrame(self, frame, tag):
+        ''' Detects a whole keyframe, in tiles if enabled. '''
+        if self.tiler is not None:
+            with tracing.span('TiledDetector.predict', frame=tag):
+                return self.tiler.predict(self.cam.native_image, frame, tag)
+        with tracing.span('DetectionNetwork.predict_batch', frame=tag, batch=1):
+            return self.network.predict_batch([frame], [tag])[0]
+
+    def detectKeyframe(self, frame, tag):
+        ''' Detects a keyframe around the tracked objects (ROI), or the whole frame. '''
+        if self.roi is not None:
+            boxes = self.tracker.getBoxes()
+            if not self.roi.isFullFrame(boxes):
+                with tracing.span('RoiDetector.predict', frame=tag, tracks=len(boxes)):
+                    detection = self.roi.predict(self.cam.native_image, boxes, tag)
+                if detection is not None:
+                    return detection
+            self.roi.full_frames += 1
+        return self.detectFrame(frame, tag)
+
+    def runSequential(self, detection):
+        ''' Processes the segments one at a time: each keyframe is detected after the tracking of its segment. '''
+        while True:
+            frames, tags = self.readSegment()
+            if not frames:
+                break
+            if len(frames) > 1:
+                with tracing.span('OfflineRunner.track', frame=tags[0], frames=len(frames) - 1):
+                    self.track(frames, tags, detection)
+            detection = self.detectKeyframe(frames[-1], tags[-1])
+
+    def run(self):
+        ''' Processes the whole source and writes the logs. '''
+        start_time = time.time()
+        im, tag = self.readFrame()
+        if im is None:
+            raise SystemExit('No frames to process in the source.')
+        if self.scheduler is not None:
+            self.scheduler.detected(im)
+        if self.roi is not None or self.tiler is not None:
+            self.runSequential(self.detectKeyframe(im, tag))
+        else:
+            self.runBatches(self.network.predict_batch([im], [tag])[0])
+
+        elapsed = time.time() - start_time
+        print('Processed %d frames in %.2f s (%.2f fps).' % (self.frames_processed, elapsed,
+                                                            self.frames_processed / max(elapsed, 1e-6)))
+        if self.scheduler is not None:
+            self.scheduler.printReport()
+        if self.roi is not None:
+            print(self.roi.report())
+        if self.tiler is not None:
+            print(self.tiler.report())
+        if self.tracker.logger_status:
+            self.tracker.logTracking()
+            self.network.logNetwork()
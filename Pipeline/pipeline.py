@@ -0,0 +1,72 @@
+#
+# Created on Oct, 2026
+#
+# Event-driven runtime connecting the Camera, Network, Tracker and GUI threads.
+# Every module is a stage with a wake-up event: a stage sleeps until another
+# stage notifies it that there is work to do, so the application runs as fast
+# as the slowest computation allows instead of at a fixed polling rate.
+#
+
+import threading
+from collections import OrderedDict
+
+t_idle = 1.0  # s, safety timeout for stages waiting on an event
+
+
+class Stage:
+
+    def __init__(self, name, depth=None):
+        ''' Stage of the pipeline: a wake-up event and an optional queue depth getter. '''
+        self.name = name
+        self.event = threading.Event()
+        self.depth = depth
+
+    def notify(self):
+        ''' Wakes up the stage. '''
+        self.event.set()
+
+    def clear(self):
+        ''' Clears pending notifications. Call it before checking for work. '''
+        self.event.clear()
+
+    def wait(self, timeout=t_idle):
+        ''' Blocks until the stage is notified or the timeout expires. '''
+        return self.event.wait(timeout)
+
+    def getQueueDepth(self):
+        ''' Returns the number of items waiting to be processed by the stage. '''
+        if self.depth is None:
+            return 0
+        return self.depth()
+
+
+class Pipeline:
+
+    def __init__(self, buffer_size):
+        ''' Pipeline class holds the stages and the bound of the frame queues. '''
+        self.stages = OrderedDict()
+        self.buffer_size = buffer_size
+
+    def addStage(self, name, depth=None):
+        ''' Registers a new stage and returns it. '''
+        stage = Stage(name, depth)
+        self.stages[name] = stage
+        return stage
+
+    def getStage(self, name):
+        ''' Returns the stage registered with that name. '''
+        return self.stages[name]
+
+    def setQueueDepth(self, name, depth):
+        ''' Sets the queue depth getter of a stage. '''
+        self.stages[name].depth = depth
+
+    def notify(self, name):
+        ''' Wakes up the stage registered with that name, if any. '''
+        stage = self.stages.get(name)
+        if stage is not None:
+            stage.notify()
+
+    def getQueueDepths(self):
+        ''' Returns the queue depth of each stage. '''
+        return OrderedDict((name, stage.getQueueDepth()) for name, stage in self.stages.items())
@@ -0,0 +1,136 @@
+#
+# Created on Oct, 2026
+#
+# Region of interest detection for high resolution sources. The boxes of the
+# tracked objects, expanded by a margin, define crops of the native frame that
+# are detected in a single batch at the input size of the network, so small
+# objects keep far more pixels than in the resized full frame. The detections
+# of the crops are mapped back to the frame and their duplicates suppressed.
+#
+
+import time
+
+import cv2
+import numpy as np
+
+from Net.utils import postprocessing
+from Net.utils.detections import Detections
+
+
+class RoiDetector:
+
+    def __init__(self, network, input_size, margin=0.5, min_size=128, max_regions=8, full_interval=5,
+                 iou_threshold=0.5):
+        ''' RoiDetector class detects the regions of a native frame around the tracked objects.
+        input_size: (width, height) of the images of the network (the crops have its aspect ratio).
+        margin: expansion of the boxes, as a fraction of their size.
+        min_size: minimum height of the crops (native px).
+        max_regions: maximum number of crops of a frame (the frame is fully detected above).
+        full_interval: keyframes between two full frame detections (new objects). '''
+        self.network = network
+        self.input_size = (int(input_size[0]), int(input_size[1]))
+        self.margin = margin
+        self.min_size = min_size
+        self.max_regions = max_regions
+        self.full_interval = max(full_interval, 1)
+        self.iou_threshold = iou_threshold
+        self.keyframes = 0
+        # metrics
+        self.full_frames = 0
+        self.roi_frames = 0
+        self.regions_detected = 0
+        self.pixels_detected = 0  # native pixels covered by the crops
+        self.pixels_full = 0  # native pixels of the frames detected through crops
+
+    def isFullFrame(self, boxes):
+        ''' Checks if the next keyframe has to be fully detected. Counts the keyframes. '''
+        self.keyframes += 1
+        return not len(boxes) or self.keyframes % self.full_interval == 0
+
+    def getRegions(self, boxes, width, height):
+        '''
+        Returns the crops around the boxes: (xmin, ymin, xmax, ymax) in native pixels, with the
+        aspect ratio of the network input. Overlapping crops are merged, so every object is
+        detected in one crop at most. Returns None if the crops exceed max_regions.
+        '''
+        aspect = float(self.input_size[0]) / self.input_size[1]
+        sizes = boxes[:, 2:] - boxes[:, :2]
+        centers = (boxes[:, :2] + boxes[:, 2:]) / 2.0
+        regions_h = np.maximum(np.maximum(sizes[:, 1], sizes[:, 0] / aspect) * (1 + 2 * self.margin), self.min_size)
+        half = np.stack([regions_h * aspect, regions_h], axis=1) / 2.0
+        regions = np.concatenate([centers - half, centers + half], axis=1)
+
+        merged = True
+        while merged and len(regions) > 1:
+            merged = False
+            for i in range(len(regions)):
+                overlap = ((regions[:, 0] < regions[i, 2]) & (regions[i, 0] < regions[:, 2]) &
+                           (regions[:, 1] < regions[i, 3]) & (regions[i, 1] < regions[:, 3]))
+                overlap[i] = False
+                if overlap.any():
+                    group = np.append(np.flatnonzero(overlap), i)
+                    union = np.concatenate([regions[group, :2].min(axis=0), regions[group, 2:].max(axis=0)])
+                    regions = np.vstack([np.delete(regions, group, axis=0), self.fitAspect(union, aspect)])
+                    merged = True
+                    break
+        if len(regions) > self.max_regions:
+            return None
+
+        # move the crops inside the frame (without changing their size unless larger than the frame)
+        regions_size = np.minimum(regions[:, 2:] - regions[:, :2], [width, height])
+        origins = np.clip(regions[:, :2], 0, np.array([width, height]) - regions_size)
+        return np.round(np.concatenate([origins, origins + regions_size], axis=1)).astype(int)
+
+    def fitAspect(self, region, aspect):
+        ''' Grows a region around its center to the given aspect ratio. '''
+        width, height = region[2] - region[0], region[3] - region[1]
+        width, height = max(width, height * aspect), max(height, width / aspect)
+        center_x, center_y = (region[0] + region[2]) / 2.0, (region[1] + region[3]) / 2.0
+        return np.array([center_x - width / 2, center_y - height / 2, center_x + width / 2, center_y + height / 2])
+
+    def predict(self, native_image, boxes, frame_number):
+        '''
+        Detects the objects of a native frame in the crops around the tracked boxes.
+
+        Arguments:
+            native_image (array): RGB frame at the resolution of the source.
+            boxes (array): `(n, 4)` tracked boxes in pixels of the network images.
+            frame_number (int): number of the frame (for the log).
+
+        Returns:
+            The Detections of the frame in pixels of the network images, or None if the
+            frame has to be fully detected (too many crops).
+        '''
+        start_time = time.time()
+        scale_x, scale_y = self.network.image_scale
+        height, width = native_image.shape[:2]
+        regions = self.getRegions(np.asarray(boxes, dtype=np.float64) * [scale_x, scale_y, scale_x, scale_y],
+                                  width, height)
+        if regions is None:
+            return None
+
+        crops = [cv2.resize(native_image[ymin:ymax, xmin:xmax], self.input_size, interpolation=cv2.INTER_AREA)
+                 for xmin, ymin, xmax, ymax in regions]
+        results = self.network.detectBatch(crops)
+        # crop pixels -> native pixels -> network image pixels
+        detections = [detection.transformed(float(xmax - xmin) / self.input_size[0] / scale_x,
+                                            float(ymax - ymin) / self.input_size[1] / scale_y,
+                                            xmin / scale_x, ymin / scale_y)
+                      for detection, (xmin, ymin, xmax, ymax) in zip(results, regions)]
+        detection = postprocessing.non_max_suppression(
+            Detections.concatenate(detections, self.network.label_table), self.iou_threshold)
+
+        self.network.logDetections(frame_number, detection, 1.0 / (time.time() - start_time))
+        self.roi_frames += 1
+        self.regions_detected += len(regions)
+        self.pixels_detected += int(np.prod(regions[:, 2:] - regions[:, :2], axis=1).sum())
+        self.pixels_full += width * height
+        return detection
+
+    def report(self):
+        ''' Returns a summary of the detections. '''
+        covered = 100.0 * self.pixels_detected / self.pixels_full if self.pixels_full else 0.0
+        return ('ROI: %d keyframes detected in %d crops (%.1f crops per keyframe, %.1f%% of the frame), '
+                '%d full frames.' % (self.roi_frames, self.regions_detected,
+                                     self.regions_detected / float(max(self.roi_frames, 1)), covered,
+                                     self.full_frames))
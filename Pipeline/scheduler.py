@@ -0,0 +1,94 @@
+#
+# Created on Oct, 2026
+#
+# Motion-gated scheduling of the detections. Every frame is compared with the
+# frame of the last detection on a small grayscale thumbnail: the network is
+# run again when a large part of the scene changed or when the tracker lost
+# most of its objects, and skipped while the scene stays static (up to a
+# maximum interval, so new still objects are eventually detected).
+#
+
+import cv2
+import numpy as np
+
+from Pipeline import instrumentation
+
+REASONS = ('motion', 'lost', 'interval')
+
+
+class MotionScheduler:
+
+    def __init__(self, threshold=0.02, pixel_threshold=25, width=64, min_interval=2, max_interval=100,
+                 lost_ratio=0.5):
+        ''' MotionScheduler class decides when the network has to detect again.
+        threshold: fraction of the thumbnail that must change (pixels differing by more than pixel_threshold).
+        width: width of the thumbnails (the height keeps the aspect ratio).
+        min_interval, max_interval: frames between two detections.
+        lost_ratio: fraction of lost tracks which triggers a detection. '''
+        self.threshold = threshold
+        self.pixel_threshold = pixel_threshold
+        self.width = width
+        self.min_interval = max(min_interval, 1)
+        self.max_interval = max(max_interval, self.min_interval)
+        self.lost_ratio = lost_ratio
+        self.reference = None  # thumbnail of the frame of the last detection
+        self.score = 0.0  # largest change since the last detection
+        self.frames = 0  # frames since the last detection
+        # metrics
+        self.triggered = dict((reason, 0) for reason in REASONS)
+        self.skipped = 0
+
+    def thumbnail(self, frame):
+        ''' Returns the small grayscale version of an RGB frame. '''
+        height = max(1, int(round(frame.shape[0] * float(self.width) / frame.shape[1])))
+        small = cv2.resize(frame, (self.width, height), interpolation=cv2.INTER_AREA)
+        return cv2.cvtColor(small, cv2.COLOR_RGB2GRAY)
+
+    def observe(self, frame):
+        ''' Scores the change of a new frame with respect to the frame of the last detection. '''
+        with instrumentation.timer('motion'):
+            self.frames += 1
+            if self.reference is None:
+                self.score = 1.0
+                return self.score
+            diff = cv2.absdiff(self.thumbnail(frame), self.reference)
+            score = np.count_nonzero(diff > self.pixel_threshold) / float(diff.size)
+            self.score = max(self.score, score)
+            return score
+
+    def getReason(self, lost_ratio=0.0):
+        ''' Returns why the network has to detect now (None if the detection can be skipped). '''
+        if self.frames < self.min_interval and self.reference is not None:
+            return None
+        if self.score >= self.threshold:
+            return 'motion'
+        if lost_ratio >= self.lost_ratio and lost_ratio > 0:
+            return 'lost'
+        if self.frames >= self.max_interval:
+            return 'interval'
+        return None
+
+    def shouldDetect(self, lost_ratio=0.0):
+        ''' Checks if the network has to detect now. Counts the skipped detections. '''
+        reason = self.getReason(lost_ratio)
+        if reason is None:
+            self.skipped += 1
+            return False
+        self.triggered[reason] += 1
+        return True
+
+    def detected(self, frame):
+        ''' The frame is sent to the network: it becomes the reference of the next changes. '''
+        self.reference = self.thumbnail(frame)
+        self.score = 0.0
+        self.frames = 0
+
+    def report(self):
+        ''' Returns a summary of the decisions. '''
+        return 'Scheduler: %d detections (%s), %d skipped.' % (
+            sum(self.triggered.values()), ', '.join('%d by %s' % (self.triggered[reason], reason)
+                                                     for reason in REASONS), self.skipped)
+
+    def printReport(self):
+        ''' Prints the summary of the decisions. '''
+        print(self.report())
@@ -0,0 +1,146 @@
+#
+# Created on Oct, 2026
+#
+# Tiled detection of high resolution frames. The native frame is split into
+# overlapping tiles, each one resized to the input size of the network, and
+# the tiles (and optionally the resized whole frame, for the large objects)
+# are detected in a single batch. The detections of the tiles are mapped back
+# to the frame and the objects found in several tiles are merged by NMS. The
+# boxes cut by an inner border of a tile are dropped: the overlapping tiles (or
+# the whole frame) see the complete objects.
+#
+
+import numpy as np
+import cv2
+
+from Net.utils import postprocessing
+from Net.utils.detections import Detections
+from Pipeline import instrumentation
+
+BORDER_MARGIN = 2  # px of the tiles, boxes this close to an inner border are cut by the tile
+
+
+def tile_origins(length, tile, overlap):
+    ''' Returns the origins of the tiles covering a length, evenly spread with at least the given overlap. '''
+    if tile >= length:
+        return np.zeros(1, dtype=int)
+    step = tile * (1.0 - overlap)
+    count = int(np.ceil((length - tile) / step)) + 1
+    return np.round(np.linspace(0, length - tile, count)).astype(int)
+
+
+class TiledDetector:
+
+    def __init__(self, network, input_size, tile_size=(600, 600), overlap=0.2, max_tiles=16, full_frame=True,
+                 iou_threshold=0.5):
+        ''' TiledDetector class detects a native frame in overlapping tiles.
+        input_size: (width, height) of the images of the network (the tiles are resized to it).
+        tile_size: (width, height) of the tiles (native px), enlarged if the frame needs more than max_tiles.
+        overlap: minimum overlap of two neighbouring tiles, as a fraction of the tile size.
+        full_frame: detects the resized frame in the same batch (objects larger than a tile). '''
+        if not 0 <= overlap < 1:
+            raise SystemExit('Tiles Overlap must be in [0, 1).')
+        self.network = network
+        self.input_size = (int(input_size[0]), int(input_size[1]))
+        self.tile_size = (int(tile_size[0]), int(tile_size[1]))
+        self.overlap = overlap
+        self.max_tiles = max(max_tiles, 1)
+        self.full_frame = full_frame
+        self.iou_threshold = iou_threshold
+        self.tiles = {}  # frame size -> tiles, computed once per size
+        self.times = {}  # batch size -> frames, crop, detect and merge times (s)
+
+    def getTiles(self, width, height):
+        ''' Returns the tiles of a frame: `(n, 4)` (xmin, ymin, xmax, ymax) in native pixels. '''
+        tiles = self.tiles.get((width, height))
+        if tiles is not None:
+            return tiles
+        tile_width, tile_height = min(self.tile_size[0], width), min(self.tile_size[1], height)
+        while True:
+            xs = tile_origins(width, tile_width, self.overlap)
+            ys = tile_origins(height, tile_height, self.overlap)
+            if len(xs) * len(ys) <= self.max_tiles:
+                break
+            # too many tiles: larger tiles (less resolution) until they fit
+            tile_width, tile_height = min(int(tile_width * 1.25), width), min(int(tile_height * 1.25), height)
+        origins = np.array([(x, y) for y in ys for x in xs], dtype=int).reshape(-1, 2)
+        tiles = np.concatenate([origins, origins + [tile_width, tile_height]], axis=1)
+        self.tiles[(width, height)] = tiles
+        print('Tiles: %d tiles of %dx%d px for frames of %dx%d px.' % (len(tiles), tile_width, tile_height,
+                                                                      width, height))
+        return tiles
+
+    def predict(self, native_image, image, frame_number):
+        '''
+        Detects the objects of a native frame in tiles.
+
+        Arguments:
+            native_image (array): RGB frame at the resolution of the source.
+            image (array): the same frame resized to the input size of the network.
+            frame_number (int): number of the frame (for the log).
+
+        Returns:
+            The Detections of the frame in pixels of the network images.
+        '''
+        start_time = instrumentation.clock()
+        scale_x, scale_y = self.network.image_scale
+        tiles = self.getTiles(native_image.shape[1], native_image.shape[0])
+        crops = [cv2.resize(native_image[ymin:ymax, xmin:xmax], self.input_size, interpolation=cv2.INTER_AREA)
+                 for xmin, ymin, xmax, ymax in tiles]
+        crop_time = self.record('tile_crop', start_time)
+        results = self.network.detectBatch(([image] if self.full_frame else []) + crops)
+        detect_time = self.record('tile_detect', start_time + crop_time)
+        height, width = native_image.shape[:2]
+        tile_detections = [self.inside(detection, tile, width, height)
+                           for detection, tile in zip(results[-len(tiles):], tiles)]
+        # tile pixels -> native pixels -> network image pixels
+        detections = [detection.transformed(float(xmax - xmin) / self.input_size[0] / scale_x,
+                                            float(ymax - ymin) / self.input_size[1] / scale_y,
+                                            xmin / scale_x, ymin / scale_y)
+                      for detection, (xmin, ymin, xmax, ymax) in zip(tile_detections, tiles)]
+        if self.full_frame:
+            detections.append(results[0])
+        detection = postprocessing.non_max_suppression(
+            Detections.concatenate(detections, self.network.label_table), self.iou_threshold)
+        merge_time = self.record('tile_merge', start_time + crop_time + detect_time)
+
+        # one sample per frame: the tiles share the crops and a single network call
+        times = self.times.setdefault(len(results), [0, 0.0, 0.0, 0.0])
+        for index, value in enumerate((1, crop_time, detect_time, merge_time)):
+            times[index] += value
+        self.network.logDetections(frame_number, detection, 1.0 / (crop_time + detect_time + merge_time))
+        return detection
+
+    def inside(self, detection, tile, width, height):
+        ''' Drops the detections of a tile (in tile pixels) which touch one of its inner borders
+        (an edge of the tile which is not an edge of the frame). '''
+        xmin, ymin, xmax, ymax = tile
+        boxes = detection.boxes
+        cut = np.zeros(len(boxes), dtype=bool)
+        if xmin > 0:
+            cut |= boxes[:, 0] < BORDER_MARGIN
+        if ymin > 0:
+            cut |= boxes[:, 1] < BORDER_MARGIN
+        if xmax < width:
+            cut |= boxes[:, 2] > self.input_size[0] - BORDER_MARGIN
+        if ymax < height:
+            cut |= boxes[:, 3] > self.input_size[1] - BORDER_MARGIN
+        return detection[~cut] if cut.any() else detection
+
+    def record(self, stage, start_time):
+        ''' Records a step of the detection of a frame which has just finished. Returns its duration. '''
+        duration = instrumentation.clock() - start_time
+        instrumentation.record(stage, duration)
+        return duration
+
+    def report(self):
+        ''' Returns the mean times (ms) of the frames for each batch size. The tiles of a frame share a
+        single network call, so the latency of one tile is not measured: only the batch time per image is. '''
+        lines = ['Tiles: %d frames detected.' % sum(times[0] for times in self.times.values())]
+        for batch_size, (frames, crop_time, detect_time, merge_time) in sorted(self.times.items()):
+            lines.append('  batch of %d images (%d frames): crop %.1f ms, detect %.1f ms (%.1f ms per image), '
+                         'merge %.1f ms per frame.' % (batch_size, frames, 1000.0 * crop_time / frames,
+                                                        1000.0 * detect_time / frames,
+                                                        1000.0 * detect_time / frames / batch_size,
+                                                        1000.0 * merge_time / frames))
+        return '\n'.join(lines)
@@ -0,0 +1,154 @@
+#
+# Created on Oct, 2026
+#
+# Opt-in timeline of the pipeline in the Chrome trace event format
+# (open it in chrome://tracing or https://ui.perfetto.dev).
+# The spans of the threads and the stage timers of the instrumentation are
+# written as complete events tagged with the frame number and the thread,
+# and the queue depths as counters, so that the waits between stages show up.
+#
+# Usage:
+#   tracing.enable('trace.json')
+#   with tracing.span('Tracker.track', frame=n):
+#       ...
+#
+
+import json
+import os
+import threading
+from contextlib import contextmanager
+
+from Pipeline import instrumentation
+
+
+class Tracer:
+
+    def __init__(self, path):
+        ''' Tracer class streams the events to a JSON array in path. '''
+        self.path = path
+        self.tracefile = open(path, 'w')
+        self.tracefile.write('[\n')
+        self.first = True
+        self.pid = os.getpid()
+        self.start_time = instrumentation.clock()
+        self.threads = set()
+        self.local = threading.local()  # frame of the span being run by each thread
+        self.lock = threading.Lock()
+        self.closed = False
+
+    def timestamp(self, t):
+        ''' Returns the microseconds from the start of the trace. '''
+        return (t - self.start_time) * 10 ** 6
+
+    def write(self, event):
+        ''' Writes an event, with the name of its thread the first time the thread is seen. '''
+        thread = threading.current_thread()
+        event['pid'] = self.pid
+        event['tid'] = thread.ident
+        with self.lock:
+            if self.closed:
+                return
+            if thread.ident not in self.threads:
+                self.threads.add(thread.ident)
+                self.writeLine({'name': 'thread_name', 'ph': 'M', 'pid': self.pid, 'tid': thread.ident,
+                                'args': {'name': thread.name}})
+            self.writeLine(event)
+
+    def writeLine(self, event):
+        ''' Appends an event to the JSON array. '''
+        if not self.first:
+            self.tracefile.write(',\n')
+        self.first = False
+        self.tracefile.write(json.dumps(event))
+
+    def getFrame(self):
+        ''' Returns the frame of the span run by the current thread. '''
+        return getattr(self.local, 'frame', None)
+
+    def complete(self, name, start, duration, args=None):
+        ''' Writes an event which started at start and lasted duration (seconds). '''
+        args = dict(args) if args else {}
+        frame = self.getFrame()
+        if frame is not None:
+            args.setdefault('frame', frame)
+        self.write({'name': name, 'ph': 'X', 'ts': self.timestamp(start), 'dur': duration * 10 ** 6,
+                    'args': args})
+
+    def instant(self, name, args=None):
+        ''' Writes an event without duration (a hand-off between stages). '''
+        self.write({'name': name, 'ph': 'i', 's': 't', 'ts': self.timestamp(instrumentation.clock()),
+                    'args': args or {}})
+
+    def counter(self, name, values):
+        ''' Writes the values of a counter (queue depths). '''
+        self.write({'name': name, 'ph': 'C', 'ts': self.timestamp(instrumentation.clock()), 'args': values})
+
+    def onStage(self, name, start, duration):
+        ''' Listener of the instrumentation: stage timers become events of the timeline. '''
+        self.complete(name, start, duration)
+
+    def close(self):
+        ''' Terminates the JSON array and closes the file. '''
+        with self.lock:
+            if self.closed:
+                return
+            self.closed = True
+            self.tracefile.write('\n]\n')
+            self.tracefile.close()
+
+
+# tracer of the application, None if tracing is off
+tracer = None
+
+
+def enable(path):
+    ''' Starts tracing the application to path. '''
+    global tracer
+    tracer = Tracer(path)
+    instrumentation.registry.addListener(tracer.onStage)
+    print('Tracing the pipeline to %s.' % path)
+    return tracer
+
+
+def close():
+    ''' Stops tracing and completes the trace file. '''
+    global tracer
+    if tracer is not None:
+        instrumentation.registry.removeListener(tracer.onStage)
+        tracer.close()
+        print('Trace written to %s.' % tracer.path)
+        tracer = None
+
+
+@contextmanager
+def span(name, **args):
+    ''' Records the block as an event (no-op if tracing is off). The args can be
+    completed inside the block, e.g. with the frame number once it is known. '''
+    active = tracer
+    if active is None:
+        yield args
+        return
+    previous_frame = active.getFrame()
+    active.local.frame = args.get('frame')
+    start = instrumentation.clock()
+    try:
+        yield args
+    finally:
+        active.local.frame = previous_frame
+        if args.get('frame') is None:
+            args.pop('frame', None)
+        active.complete(name, start, instrumentation.clock() - start, args)
+
+
+def instant(name, **args):
+    ''' Records a hand-off event (no-op if tracing is off). '''
+    active = tracer
+    if active is not None:
+        active.instant(name, args)
+
+
+def counter(name, values):
+    ''' Records counter values (no-op if tracing is off). '''
+    active = tracer
+    if active is not None:
+        active.counter(name, values)
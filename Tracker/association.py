@@ -0,0 +1,119 @@
+#
+# Created on Oct, 2026
+#
+# Association of the detections of the network with the current tracks.
+# Boxes are given in corners format: (xmin, ymin, xmax, ymax).
+#
+
+import numpy as np
+
+from Net.Keras.bounding_box_utils.bounding_box_utils import iou
+
+try:
+    from scipy.optimize import linear_sum_assignment
+except ImportError:  # scipy is optional, fall back to our own solver
+    linear_sum_assignment = None
+
+
+def iouMatrix(boxes1, boxes2):
+    ''' Returns the (n, m) matrix of IoU between n boxes and m boxes. '''
+    boxes1 = np.asarray(boxes1, dtype=np.float64).reshape(-1, 4)
+    boxes2 = np.asarray(boxes2, dtype=np.float64).reshape(-1, 4)
+    n, m = len(boxes1), len(boxes2)
+    if n == 0 or m == 0:
+        return np.zeros((n, m))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        overlaps = iou(np.repeat(boxes1, m, axis=0), np.tile(boxes2, (n, 1)), coords='corners')
+    return np.nan_to_num(overlaps).reshape(n, m)
+
+
+def hungarian(cost):
+    ''' Solves the rectangular linear assignment problem minimizing the cost.
+    Returns the arrays of matched rows and columns. '''
+    cost = np.asarray(cost, dtype=np.float64)
+    if cost.size == 0:
+        return np.zeros(0, dtype=int), np.zeros(0, dtype=int)
+    if linear_sum_assignment is not None:
+        return linear_sum_assignment(cost)
+    transposed = cost.shape[0] > cost.shape[1]
+    if transposed:
+        cost = cost.T
+    n, m = cost.shape
+    # shortest augmenting path with potentials, O(n^2 m)
+    u = np.zeros(n + 1)
+    v = np.zeros(m + 1)
+    p = np.zeros(m + 1, dtype=int)  # row (1-based) assigned to each column
+    way = np.zeros(m + 1, dtype=int)
+    for i in range(1, n + 1):
+        p[0] = i
+        j0 = 0
+        minv = np.full(m + 1, np.inf)
+        used = np.zeros(m + 1, dtype=bool)
+        while True:
+            used[j0] = True
+            i0 = p[j0]
+            free = ~used[1:]
+            delta = cost[i0 - 1] - u[i0] - v[1:]
+            improve = free & (delta < minv[1:])
+            minv[1:][improve] = delta[improve]
+            way[1:][improve] = j0
+            candidates = np.where(free, minv[1:], np.inf)
+            j1 = int(np.argmin(candidates)) + 1
+            d = candidates[j1 - 1]
+            u[p[used]] += d
+            v[used] -= d
+            minv[1:][free] -= d
+            j0 = j1
+            if p[j0] == 0:
+                break
+        while j0:
+            j1 = way[j0]
+            p[j0] = p[j1]
+            j0 = j1
+    cols = np.nonzero(p[1:])[0]
+    rows = p[1:][cols] - 1
+    order = np.argsort(rows)
+    rows, cols = rows[order], cols[order]
+    if transposed:
+        rows, cols = cols, rows
+        order = np.argsort(rows)
+        rows, cols = rows[order], cols[order]
+    return rows, cols
+
+
+def greedy(overlaps):
+    ''' Matches the pairs with the highest IoU first. Returns the arrays of matched rows and columns. '''
+    rows = []
+    cols = []
+    if overlaps.size:
+        order = np.argsort(-overlaps, axis=None)
+        used_rows = np.zeros(overlaps.shape[0], dtype=bool)
+        used_cols = np.zeros(overlaps.shape[1], dtype=bool)
+        for row, col in zip(*np.unravel_index(order, overlaps.shape)):
+            if not used_rows[row] and not used_cols[col]:
+                used_rows[row] = used_cols[col] = True
+                rows.append(row)
+                cols.append(col)
+    return np.array(rows, dtype=int), np.array(cols, dtype=int)
+
+
+def associate(track_boxes, detection_boxes, iou_threshold, method='hungarian', track_labels=None, detection_labels=None):
+    ''' Matches tracks and detections by IoU (only between the same labels if given).
+    Returns the list of (track, detection, iou) matches and the unmatched track and detection indices. '''
+    overlaps = iouMatrix(track_boxes, detection_boxes)
+    if track_labels is not None and detection_labels is not None and overlaps.size:
+        same_label = np.asarray(track_labels)[:, np.newaxis] == np.asarray(detection_labels)[np.newaxis, :]
+        overlaps = np.where(same_label, overlaps, 0)
+
+    if method == 'greedy':
+        rows, cols = greedy(overlaps)
+    else:
+        rows, cols = hungarian(1 - overlaps)
+
+    matches = [(int(row), int(col), float(overlaps[row, col])) for row, col in zip(rows, cols)
+               if overlaps[row, col] >= iou_threshold]
+    matched_tracks = set(row for row, _, _ in matches)
+    matched_detections = set(col for _, col, _ in matches)
+    unmatched_tracks = [i for i in range(overlaps.shape[0]) if i not in matched_tracks]
+    unmatched_detections = [j for j in range(overlaps.shape[1]) if j not in matched_detections]
+    return matches, unmatched_tracks, unmatched_detections
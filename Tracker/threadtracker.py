@@ -7,31 +7,28 @@
 # https://github.com/JdeRobot/dl-objectdetector
 #
 
-import time
 import threading
-from datetime import datetime
 
-t_cycle = 150  # ms
+from Pipeline import tracing
 
 
 class ThreadTracker(threading.Thread):
 
-    def __init__(self, tracker):
+    def __init__(self, tracker, pipeline):
         ''' Threading class for Tracker. '''
         self.tracker = tracker
+        self.pipeline = pipeline
+        self.stage = pipeline.getStage('tracker')
         threading.Thread.__init__(self)
 
     def run(self):
         ''' Updates the thread. '''
         while True:
-            start_time = datetime.now()
-            if self.tracker.activated:
-                self.tracker.track()
-            end_time = datetime.now()
-
-            dt = end_time - start_time
-            dtms = ((dt.days * 24 * 60 * 60 + dt.seconds) * 1000 +
-                    dt.microseconds / 1000.0)
-
-            if dtms < t_cycle:
-                time.sleep((t_cycle - dtms) / 1000.0)
\ No newline at end of file
+            self.stage.clear()
+            if self.tracker.hasWork():
+                frame_tags = self.tracker.frame_tags
+                with tracing.span('Tracker.track', frame=frame_tags[0] if frame_tags else None):
+                    self.tracker.track()
+                self.pipeline.notify('camera')  # tracked image ready
+            else:
+                self.stage.wait()
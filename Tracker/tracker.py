@@ -1,19 +1,50 @@
-import os
 import time
-import yaml
+from collections import OrderedDict
+from multiprocessing.pool import ThreadPool
 import cv2
-import dlib
+
+from Net.utils.detections import Detections
+from Pipeline import imports, instrumentation, tracing
+from Tracker import association
+
+dlib = imports.lazy('dlib')  # only imported with Lib: dlib
+
+MIN_BOX_SIZE = 2  # px, smaller boxes (e.g. slivers of objects cut by a crop) are not tracked
+
+
+class Track:
+    def __init__(self, track_id, tracker, class_id, label, box):
+        ''' Object followed by a tracker, with a stable id across detections. '''
+        self.id = track_id
+        self.tracker = tracker
+        self.class_id = class_id
+        self.label = label
+        self.box = box  # (xmin, ymin, xmax, ymax) in the last tracked image
+        self.ok = True  # the last update found the object
 
 
 class Tracker:
     def __init__(self, tracker_prop, tracker_lib):
 
         if tracker_lib == 'opencv':
-            self.trackers_opencv = {}
             self.lib = 'opencv'
             self.type = tracker_prop['Type']
         elif tracker_lib == 'dlib':
             self.lib = 'dlib'
+            imports.load('dlib')  # at startup rather than on the first detection
+
+        # association of the detections with the current tracks
+        self.iou_threshold = tracker_prop.get('IoUThreshold', 0.3)
+        self.drift_threshold = tracker_prop.get('DriftThreshold', 0.5)
+        self.assignment = tracker_prop.get('Assignment', 'hungarian').lower()
+        self.tracks = OrderedDict()  # track id -> Track
+        self.label_table = None
+        self.output_detection = None
+        self.next_track_id = 1
+        # OpenCV releases the GIL while updating: objects are tracked concurrently. The dlib
+        # correlation trackers hold it, so a pool would only add overhead: they are updated serially
+        self.workers = tracker_prop.get('Workers', 1) if self.lib == 'opencv' else 1
+        self.pool = ThreadPool(self.workers) if self.workers > 1 else None
 
         self.activated = False
         self.input_detection = None
@@ -33,16 +64,12 @@ class Tracker:
         self.len_buffer_in = 0
         self.first_image_to_track = True
         self.image = None
-        self.network_framework = None
-        self.trackers_dlib = []
-        self.labels_dlib = []
         self.frame_tags = []
         self.log_data = []
-        self.log_tracking_results = []
-        self.fps_tracking_results = []
-        self.log_done = False
+        self.result_logger = None
         self.logger_status = True
         self.image_scale = (None, None)
+        self.realtime = True  # adapt the tracking speed to the camera (skip frames if slow)
 
         print("Tracker created!")
 
@@ -53,9 +80,7 @@ class Tracker:
                 self.buffer_in.pop(0)
                 self.buffer_in.pop(0)
                 self.image = self.buffer_in.pop(0)  # jump frames
-                if self.logger_status:
-                    self.log_tracking_results.append([self.frame_tags[0] - 1])  # log skipped frames
-                    self.log_tracking_results.append([self.frame_tags[0]])
+                self.logResults([[self.frame_tags[0] - 1], [self.frame_tags[0]]])  # log skipped frames
                 print('INFO: Frames skipped during tracking.')
             elif len(self.buffer_in) > 0:
                 self.image = self.buffer_in.pop(0)
@@ -73,8 +98,8 @@ class Tracker:
         self.last_fps_buffer.pop(0)
         self.last_fps_buffer.append(fps_rate)
         self.avg_fps = sum(self.last_fps_buffer) / len(self.last_fps_buffer)
-        if self.logger_status:
-            self.fps_tracking_results.append(fps_rate)  # to get final fps mean
+        if self.logger_status and self.result_logger is not None:
+            self.result_logger.logFps(fps_rate)  # to get final fps mean
         return self.avg_fps
 
     def trackerSpeedMode(self, avg_fps):
@@ -91,58 +116,97 @@ class Tracker:
             self.counter_fast += 1
             self.tracker_fast = True
 
-    def configureFirstTrackDlib(self, detection_dlib):
-        ''' Configures the dlib tracker with the detections from the net. '''
-
-        if self.network_framework == "Keras":
-            xmin = detection_dlib[1]
-            ymin = detection_dlib[0]
-            xmax = detection_dlib[3]
-            ymax = detection_dlib[2]
-        elif self.network_framework == "TensorFlow":
-            xmin = detection_dlib[0]
-            ymin = detection_dlib[1]
-            xmax = detection_dlib[2]
-            ymax = detection_dlib[3]
-
-        self.labels_dlib = self.input_label
-        t = dlib.correlation_tracker()
-        rect = dlib.rectangle(xmin, ymin, xmax, ymax)
-        if not rect.is_empty():
-            t.start_track(self.image, rect)
-            self.trackers_dlib.append(t)
-
-    def createOpencvTracker(self, type, detection):
-        ''' Configures the opencv tracker type. '''
+    def createTracker(self, box):
+        ''' Creates a tracker of the configured library and initializes it with a box. '''
+        with instrumentation.timer('tracker_init'):
+            height, width = self.image.shape[:2]
+            xmin, ymin = max(box[0], 0), max(box[1], 0)  # inside the image
+            xmax, ymax = min(box[2], width), min(box[3], height)
+            if xmax - xmin < MIN_BOX_SIZE or ymax - ymin < MIN_BOX_SIZE:  # nothing to track (OpenCV asserts)
+                return None
+            if self.lib == 'dlib':
+                rect = dlib.rectangle(xmin, ymin, xmax, ymax)
+                if rect.is_empty():
+                    return None
+                t = dlib.correlation_tracker()
+                t.start_track(self.image, rect)
+            else:
+                t = self.createOpencvTracker(self.type.lower())
+                t.init(self.image, (xmin, ymin, xmax - xmin, ymax - ymin))
+            return t
+
+    def createOpencvTracker(self, type):
+        ''' Creates an opencv tracker of the given type. '''
         if type == 'kcf':
-            self.trackers_opencv = {key: cv2.TrackerKCF_create() for key in range(len(detection))}
+            return cv2.TrackerKCF_create()
         elif type == 'boosting':
-            self.trackers_opencv = {key: cv2.TrackerBoosting_create() for key in range(len(detection))}
+            return cv2.TrackerBoosting_create()
         elif type == 'mil':
-            self.trackers_opencv = {key: cv2.TrackerMIL_create() for key in range(len(detection))}
+            return cv2.TrackerMIL_create()
         elif type == 'tld':
-            self.trackers_opencv = {key: cv2.TrackerTLD_create() for key in range(len(detection))}
+            return cv2.TrackerTLD_create()
         elif type == 'medianflow':
-            self.trackers_opencv = {key: cv2.TrackerMedianFlow_create() for key in range(len(detection))}
+            return cv2.TrackerMedianFlow_create()
         elif type == 'csrt':
-            self.trackers_opencv = {key: cv2.TrackerCSRT_create() for key in range(len(detection))}
+            return cv2.TrackerCSRT_create()
         elif type == 'mosse':
-            self.trackers_opencv = {key: cv2.TrackerMOSSE_create() for key in range(len(detection))}
-
-    def configureFirstTrackOpencv(self, item, detection_opencv):
-        ''' Configures the tracker with the detections from the net. '''
-
-        if self.network_framework == "Keras":
-            xmin = detection_opencv[1]
-            ymin = detection_opencv[0]
-            xmax = detection_opencv[3] - xmin
-            ymax = detection_opencv[2] - ymin
-        elif self.network_framework == "TensorFlow":
-            xmin = detection_opencv[0]
-            ymin = detection_opencv[1]
-            xmax = detection_opencv[2] - xmin
-            ymax = detection_opencv[3] - ymin
-        self.trackers_opencv[item].init(self.image, (xmin, ymin, xmax, ymax))
+            return cv2.TrackerMOSSE_create()
+        raise SystemExit('%s not supported! Supported OpenCV trackers: KCF, BOOSTING, MIL, TLD, MEDIANFLOW, CSRT, MOSSE' % type)
+
+    def configureTracks(self, detection):
+        ''' Matches the detections from the net with the current tracks. Only the unmatched
+        detections and the drifted tracks are (re)initialized, the others keep their tracker and id. '''
+        detection_boxes = [tuple(box) for box in detection.intBoxes().tolist()]
+        detection_labels = detection.labels
+        self.label_table = detection.label_table
+        track_ids = list(self.tracks.keys())
+        matches, unmatched_tracks, unmatched_detections = association.associate(
+            [self.tracks[i].box for i in track_ids], detection_boxes, self.iou_threshold, self.assignment,
+            [self.tracks[i].class_id for i in track_ids], detection.class_ids)
+
+        for t in unmatched_tracks:  # lost
+            del self.tracks[track_ids[t]]
+
+        # drifted tracks are re-initialized with the detection, new objects get a new track
+        drifted = [(self.tracks[track_ids[t]], d) for t, d, overlap in matches
+                   if overlap < self.drift_threshold or not self.tracks[track_ids[t]].ok]
+        boxes = [detection_boxes[d] for _, d in drifted] + [detection_boxes[d] for d in unmatched_detections]
+        trackers = self.map(self.createTracker, boxes)
+
+        for (track, d), tracker in zip(drifted, trackers[:len(drifted)]):
+            if tracker is None:
+                del self.tracks[track.id]
+                continue
+            track.tracker = tracker
+            track.box = detection_boxes[d]
+            track.ok = True
+
+        for d, tracker in zip(unmatched_detections, trackers[len(drifted):]):
+            if tracker is not None:
+                self.tracks[self.next_track_id] = Track(self.next_track_id, tracker, int(detection.class_ids[d]),
+                                                        detection_labels[d], detection_boxes[d])
+                self.next_track_id += 1
+
+    def map(self, function, items):
+        ''' Applies the function to every item, in the worker pool if there is one. Keeps the order of the items. '''
+        if self.pool is not None and len(items) > 1:
+            return self.pool.map(function, items)
+        return [function(item) for item in items]
+
+    def updateTrack(self, track):
+        ''' Updates a track with the current image. '''
+        with instrumentation.timer('tracker_update'):
+            if self.lib == 'dlib':
+                tracking_quality = track.tracker.update(self.image)
+                track.ok = tracking_quality >= 7  # check tracking quality
+                if track.ok:
+                    pos = track.tracker.get_position()  # grab the position of the tracked object
+                    track.box = (int(pos.left()), int(pos.top()), int(pos.right()), int(pos.bottom()))
+            else:
+                confidence_ok, bbox = track.tracker.update(self.image)
+                track.ok = confidence_ok
+                if track.ok:
+                    track.box = (int(bbox[0]), int(bbox[1]), int(bbox[0] + bbox[2]), int(bbox[1] + bbox[3]))
 
     def track(self):
         ''' The tracking function. '''
@@ -166,101 +230,65 @@ class Tracker:
 
             if self.activated:  # avoid to continue the loop if not activated
 
-                if self.lib == 'dlib':
-                    if self.new_detection:
-                        self.trackers_dlib = []
-                        self.labels_dlib = []
-                    if self.first_image_to_track:  # create multitracker only in the first frame of the buffer
-                        for i in range(len(detection)):
-                            self.configureFirstTrackDlib(detection[i])
-
-                elif self.lib == 'opencv':
-                    if self.first_image_to_track:  # create multitracker only in the first frame of the buffer
-                        self.createOpencvTracker(self.type.lower(), detection)
-                        for i in range(len(detection)):
-                            self.configureFirstTrackOpencv(i, detection[i])
+                if self.first_image_to_track:  # match the new detections only in the first frame of the buffer
+                    self.configureTracks(detection)
 
                 self.first_image_to_track = False
                 self.new_detection = False
 
-                if self.lib == 'opencv':
-                    for obj, tracker in self.trackers_opencv.items():
-                        confidence_ok, bbox = tracker.update(self.image)
-
-                        # hotfix: avoid index out of bounds
-                        if obj == 0:
-                            previous_color_list = self.color_list
-                            previous_input_label = self.input_label
-                        if obj >= len(self.input_label):
-                            self.color_list = previous_color_list
-                            self.input_label = previous_input_label
-
-                        if confidence_ok:
-                            p1 = (int(bbox[0]), int(bbox[1]))
-                            p2 = (int(bbox[0] + bbox[2]), int(bbox[1] + bbox[3]))
-
-                            cv2.rectangle(self.image, p1, p2, self.color_list[self.input_label[obj]], thickness=2)
-                            cv2.putText(self.image, self.input_label[obj], (p1[0], p1[1] - 10), cv2.FONT_HERSHEY_SIMPLEX,
-                                        0.45,
-                                        (0, 0, 0), thickness=2, lineType=2)
-                            # cv2.putText(self.image, 'FPS avg tracking: ' + str(int(self.avg_fps)), (10, 20), cv2.FONT_HERSHEY_SIMPLEX,
-                            #             0.45,
-                            #             (255, 0, 0), thickness=1, lineType=1)
-                        # log
-                        if self.logger_status and self.frame_tags and confidence_ok:
-                            label_no_spaces = self.input_label[obj].replace(" ",
-                                                             "")  # to allow the use of metrics calculation utility
-                            p1_rescaled = (int(p1[0]*self.image_scale[0]), int(p1[1]*self.image_scale[1]))
-                            p2_rescaled = (int(p2[0] * self.image_scale[0]), int(p2[1] * self.image_scale[1]))
-                            self.log_tracking_results.append([self.frame_tags[0] - 1, label_no_spaces, 0, p1_rescaled, p2_rescaled])  # simulated confidence of tracking = 0
-                        elif self.logger_status and self.frame_tags and not confidence_ok:
-                            self.log_tracking_results.append([self.frame_tags[0] - 1])  # logging frames with no trackers (empty file)
-
-                elif self.lib == 'dlib':
-                    for i, (t, l) in enumerate(zip(self.trackers_dlib, self.labels_dlib)):
-
-                        # hotfix: avoid index out of bounds
-                        if i == 0:
-                            previous_color_list = self.color_list
-                            previous_input_label = self.labels_dlib
-                        if i >= len(self.labels_dlib):
-                            self.color_list = previous_color_list
-                            self.labels_dlib = previous_input_label
-
-                        # update the tracker
-                        tracking_quality = t.update(self.image)
-                        if tracking_quality >= 7:  # check tracking quality
-                            pos = t.get_position()  # grab the position of the tracked object
-
-                            # unpack the position object
-                            p1 = (int(pos.left()), int(pos.top()))
-                            p2 = (int(pos.right()), int(pos.bottom()))
-
-                            # draw the bounding box from the dlib tracker
-                            cv2.rectangle(self.image, p1, p2, self.color_list[self.labels_dlib[i]], thickness=2)
-                            cv2.putText(self.image, l, (p1[0], p1[1] - 10), cv2.FONT_HERSHEY_SIMPLEX,
-                                        0.45,
-                                        (0, 0, 0), thickness=2, lineType=2)
-                            # cv2.putText(self.image, 'FPS avg tracking: ' + str(int(self.avg_fps)), (10, 20),
-                            #             cv2.FONT_HERSHEY_SIMPLEX,
-                            #             0.45,
-                            #             (255, 0, 0), thickness=1, lineType=1)
-                        # log
-                        if self.logger_status and self.frame_tags and tracking_quality >= 7:
-                            label_no_spaces = l.replace(" ", "")  # to allow the use of metrics calculation utility
-                            p1_rescaled = (int(p1[0] * self.image_scale[0]), int(p1[1] * self.image_scale[1]))
-                            p2_rescaled = (int(p2[0] * self.image_scale[0]), int(p2[1] * self.image_scale[1]))
-                            self.log_tracking_results.append([self.frame_tags[0] - 1, label_no_spaces, 0, p1_rescaled, p2_rescaled])
-                        elif self.logger_status and self.frame_tags and tracking_quality < 7:
-                            self.log_tracking_results.append([self.frame_tags[0] - 1])  # logging frames with no trackers (empty file)
+                tracks = list(self.tracks.values())
+                self.map(self.updateTrack, tracks)  # update every object before drawing on the image
+
+                tracked = [track for track in tracks if track.ok]  # merge the results in track order
+                colors = self.color_list[[track.class_id for track in tracked]].tolist()
+                self.image = self.image.copy()  # the buffered frame may still be shown (input panel): never drawn on
+                for track, color in zip(tracked, colors):
+                    p1 = (track.box[0], track.box[1])
+                    p2 = (track.box[2], track.box[3])
+
+                    cv2.rectangle(self.image, p1, p2, tuple(color), thickness=2)
+                    cv2.putText(self.image, '%s %d' % (track.label, track.id), (p1[0], p1[1] - 10),
+                                cv2.FONT_HERSHEY_SIMPLEX, 0.45, (0, 0, 0), thickness=2, lineType=2)
+                # log
+                if self.logger_status and self.frame_tags and tracked:
+                    self.output_detection = Detections([track.box for track in tracked],
+                                                       [track.class_id for track in tracked],
+                                                       [0] * len(tracked), self.label_table,
+                                                       [track.id for track in tracked])
+                    self.logResults(self.output_detection.logEntries(
+                        self.frame_tags[0] - 1, self.image_scale, score=0))  # simulated confidence of tracking = 0
+                elif self.logger_status and self.frame_tags:
+                    self.logResults([[self.frame_tags[0] - 1]])  # logging frames with no trackers (empty file)
 
                 self.buffer_out.append(self.image)
                 avg_fps = self.calculateFPS(start_time)
-                self.trackerSpeedMode(avg_fps)
+                if self.realtime:
+                    self.trackerSpeedMode(avg_fps)
 
             else:
                 self.image_counter = 0  # reset when toggling modes (activated=False)
 
+    def hasWork(self):
+        ''' Checks if there is an image to track: one tracked image is kept at most waiting to be consumed. '''
+        if not self.activated or self.buffer_out or self.image_counter == self.len_buffer_in:
+            return False
+        return len(self.buffer_in) > 0 or not self.first_image_to_track
+
+    def getQueueDepth(self):
+        ''' Returns the number of images waiting to be tracked. '''
+        return len(self.buffer_in)
+
+    def getLostRatio(self):
+        ''' Returns the fraction of tracks lost in the last tracked image. '''
+        tracks = list(self.tracks.values())
+        if not tracks:
+            return 0.0
+        return sum(1 for track in tracks if not track.ok) / float(len(tracks))
+
+    def getBoxes(self):
+        ''' Returns the boxes of the tracks found in the last tracked image. '''
+        return [track.box for track in self.tracks.values() if track.ok]
+
     def setBuffer(self, buf):
         ''' Set buffer input of tracker. '''
         self.buffer_in = buf
@@ -282,44 +310,34 @@ class Tracker:
         self.input_label = label
 
     def setColorList(self, color_list):
-        ''' Set list of colors of the bboxes. '''
+        ''' Set the colors of the bboxes, indexed by class id. '''
         self.color_list = color_list
 
+    def popOutputImage(self, step):
+        ''' Returns the oldest tracked image and deletes it, advancing step images in the buffer. '''
+        self.image_counter += step
+        frame_tag = None
+        if len(self.frame_tags) > 0:
+            frame_tag = self.frame_tags.pop(0)
+            self.log_data.append(frame_tag)
+        tracing.instant('Tracker.getOutputImage', frame=frame_tag, waiting=len(self.buffer_in))
+        return self.buffer_out.pop(0)
+
     def getOutputImage(self):
         ''' Get tracked image. '''
         if self.input_detection is not None and self.buffer_out and not self.tracker_slow and not self.tracker_fast:
-            self.image_counter += 1
-            if len(self.frame_tags) > 0:
-                frame_tag = self.frame_tags.pop(0)
-                self.log_data.append(frame_tag)
-            return self.buffer_out.pop(0)  # returns last detection and deletes it
+            return self.popOutputImage(1)  # returns last detection and deletes it
         elif self.buffer_out and self.tracker_slow:
             if len(self.buffer_in) > 3:
-                self.image_counter += 3
-                if len(self.frame_tags) > 0:
-                    frame_tag = self.frame_tags.pop(0)
-                    self.log_data.append(frame_tag)
-                return self.buffer_out.pop(0)
+                return self.popOutputImage(3)
             else:
-                self.image_counter += 1
-                if len(self.frame_tags) > 0:
-                    frame_tag = self.frame_tags.pop(0)
-                    self.log_data.append(frame_tag)
-                return self.buffer_out.pop(0)
+                return self.popOutputImage(1)
         elif self.buffer_out and self.tracker_fast and self.counter_fast == 1:  # slow tracking a little, wait for network result
             self.counter_fast = 0
-            self.image_counter += 1
             self.tracker_fast = False
-            if len(self.frame_tags) > 0:
-                frame_tag = self.frame_tags.pop(0)
-                self.log_data.append(frame_tag)
-            return self.buffer_out.pop(0)
+            return self.popOutputImage(1)
         elif self.buffer_out and self.input_detection is None:
-            self.image_counter += 1
-            if len(self.frame_tags) > 0:
-                frame_tag = self.frame_tags.pop(0)
-                self.log_data.append(frame_tag)
-            return self.buffer_out.pop(0)
+            return self.popOutputImage(1)
         else:
             return None
 
@@ -336,17 +354,21 @@ class Tracker:
             self.new_detection = False
             # print('Tracking done!')
 
+    def logResults(self, entries):
+        ''' Streams log entries to the result logger. '''
+        if self.logger_status and self.result_logger is not None:
+            self.result_logger.log(entries)
+
     def logTracking(self):
-        if os.path.isfile('log_tracking.yaml') and not self.log_done:
-            with open('log_tracking.yaml', 'w') as yamlfile:
-                yaml.safe_dump(self.log_tracking_results, yamlfile, explicit_start=True, default_flow_style=False)
-        if os.path.isfile('fps_tracking.yaml') and not self.log_done:
-            with open('fps_tracking.yaml', 'w') as yamlfile:
-                self.fps_tracking_results = round((sum(self.fps_tracking_results)/len(self.fps_tracking_results)), 2)
-                yaml.safe_dump(self.fps_tracking_results, yamlfile, explicit_start=True, default_flow_style=False)
-                self.log_done = True
+        ''' Closes the log of the tracker (written incrementally during the run). '''
+        if self.result_logger is not None and not self.result_logger.closed:
+            self.result_logger.close()
             print('Log tracker done!')
 
+    def setResultLogger(self, result_logger):
+        ''' Sets the logger where the tracking results are streamed. '''
+        self.result_logger = result_logger
+
     def toggleTracker(self):
         ''' Toggles the tracker (on/off). '''
         self.activated = not self.activated
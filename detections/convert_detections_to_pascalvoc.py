@@ -1,33 +1,29 @@
-import yaml
+import argparse
+import sys
 from os import path
 
+sys.path.insert(0, path.join(path.dirname(path.abspath(__file__)), '..'))  # repository root
+
+from evaluation.pascalvoc import FrameFiles, convert_log
+
 # detections format required: <class_name> <confidence> <left> <top> <right> <bottom>
 
 
-def get_files(path_file, previous_frame):
-    with open(path_file, 'r') as stream:
-        out = yaml.load(stream)  # <frame> <class_name> <confidence> <left> <top> <right> <bottom>
-        for i in range(len(out)):
-            actual_frame = out[i][0]
-            if actual_frame == previous_frame or previous_frame is None:
-                with open('dets/'+str(actual_frame) + '.txt', 'a') as logfile:
-                    if len(out[i]) > 1:  # this was not an empty frame in terms of detections
-                        logfile.write(
-                            out[i][1] + " " + str(out[i][2]) + " " + str(out[i][3][0]) + " " + str(out[i][3][1]) + " " + str(out[i][4][0]) + " " + str(out[i][4][
-                                1]) + "\n")
-            elif actual_frame != previous_frame:
-                with open('dets/'+str(actual_frame) + '.txt', 'a') as logfile:
-                    if len(out[i]) > 1:  # this was not an empty frame in terms of detections
-                        logfile.write(
-                            out[i][1] + " " + str(out[i][2]) + " " + str(out[i][3][0]) + " " + str(out[i][3][1]) + " " + str(
-                                out[i][4][0]) + " " + str(out[i][4][
-                                                              1]) + "\n")
-            previous_frame = actual_frame
+def get_files(log_paths, output_folder, fill_gaps=False, buffer_rows=100000):
+    ''' Converts the logs in a single pass: one file per frame in output_folder. '''
+    frame_files = FrameFiles(output_folder, buffer_rows)
+    for log_path in log_paths:
+        convert_log(log_path, frame_files)  # <frame> <class_name> <confidence> <left> <top> <right> <bottom>
+    frame_files.close(fill_gaps)
 
 
 if __name__ == "__main__":
-    file_path = path.relpath("../log_tracking.yaml")
-    previous_frame_number = None
-    get_files(file_path, previous_frame_number)
-    file_path = path.relpath("../log_network.yaml")
-    get_files(file_path, previous_frame_number)
+    parser = argparse.ArgumentParser(description='Writes the result logs as one detection file per frame.')
+    parser.add_argument('logs', nargs='*', default=[path.relpath('../log_tracking.yaml'),
+                                                    path.relpath('../log_network.yaml')],
+                        help='result logs (.log or .yaml), by default ../log_tracking.yaml ../log_network.yaml')
+    parser.add_argument('--output', default='dets', help='folder of the detection files')
+    parser.add_argument('--fill-gaps', action='store_true', help='also create the empty files of the missing frames')
+    parser.add_argument('--buffer-rows', type=int, default=100000, help='rows kept in memory between writes')
+    args = parser.parse_args()
+    get_files(args.logs, args.output, args.fill_gaps, args.buffer_rows)
@@ -0,0 +1,124 @@
+#
+# Created on Oct, 2026
+#
+# Per-class Average Precision and mAP of the detections (PascalVOC criterion,
+# every point interpolation), computed in memory with vectorised IoU matching.
+#
+
+from collections import OrderedDict
+
+import numpy as np
+
+from Net.Keras.bounding_box_utils.bounding_box_utils import iou
+
+
+def frame_pairs(det_frames, gt_frames):
+    '''
+    Lists every (detection, ground truth) pair of the same frame.
+
+    Arguments:
+        det_frames (array): frames of the detections.
+        gt_frames (array): frames of the ground truth boxes, sorted.
+
+    Returns:
+        The arrays of detection and ground truth indices of the pairs, grouped by detection.
+    '''
+    starts = np.searchsorted(gt_frames, det_frames, side='left')
+    counts = np.searchsorted(gt_frames, det_frames, side='right') - starts
+    det_index = np.repeat(np.arange(len(det_frames)), counts)
+    offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    return det_index, starts[det_index] + offsets
+
+
+def match_detections(det_frames, det_scores, det_boxes, gt_frames, gt_boxes, iou_threshold=0.5):
+    '''
+    Classifies the detections of one class as true or false positives. Detections are
+    taken by decreasing score: each one is matched with the ground truth box of its frame
+    with the highest IoU, and is a true positive if the IoU reaches the threshold and
+    no detection with a higher score took that box before.
+
+    Arguments:
+        det_frames, det_scores (array): frames and scores of the `n` detections.
+        det_boxes (array): `(n, 4)` boxes in corners format.
+        gt_frames (array): frames of the `m` ground truth boxes.
+        gt_boxes (array): `(m, 4)` boxes in corners format.
+        iou_threshold (float): minimum IoU of a true positive.
+
+    Returns:
+        A boolean array of true positives in decreasing order of score.
+    '''
+    order = np.argsort(-det_scores, kind='mergesort')  # stable: ties keep the order of the log
+    det_frames, det_boxes = det_frames[order], det_boxes[order]
+    gt_order = np.argsort(gt_frames, kind='mergesort')
+    gt_frames, gt_boxes = gt_frames[gt_order], gt_boxes[gt_order]
+
+    det_index, gt_index = frame_pairs(det_frames, gt_frames)
+    tp = np.zeros(len(det_frames), dtype=bool)
+    if not len(det_index):
+        return tp
+    with np.errstate(divide='ignore', invalid='ignore'):
+        overlaps = np.nan_to_num(iou(det_boxes[det_index], gt_boxes[gt_index], coords='corners'))
+
+    # ground truth box with the highest IoU of every detection (first pair of each group)
+    best = np.lexsort((-overlaps, det_index))
+    first = np.r_[True, det_index[best][1:] != det_index[best][:-1]]
+    best = best[first]
+    candidates = best[overlaps[best] >= iou_threshold]
+    # a ground truth box is only taken by its first candidate in decreasing order of score
+    _, taken = np.unique(gt_index[candidates], return_index=True)
+    tp[det_index[candidates[taken]]] = True
+    return tp
+
+
+def average_precision(tp, n_positives):
+    '''
+    Computes the area under the interpolated precision/recall curve (every point interpolation).
+
+    Arguments:
+        tp (array): boolean array of true positives in decreasing order of score.
+        n_positives (int): number of ground truth boxes.
+
+    Returns:
+        The average precision, the precision and the recall arrays.
+    '''
+    tp_cumsum = np.cumsum(tp, dtype=np.float64)
+    fp_cumsum = np.cumsum(~tp, dtype=np.float64)
+    recall = tp_cumsum / n_positives if n_positives else np.zeros(len(tp))
+    precision = tp_cumsum / np.maximum(tp_cumsum + fp_cumsum, np.finfo(np.float64).eps)
+
+    mrec = np.concatenate(([0.0], recall, [1.0]))
+    mpre = np.concatenate(([0.0], precision, [0.0]))
+    mpre = np.maximum.accumulate(mpre[::-1])[::-1]
+    changes = np.nonzero(mrec[1:] != mrec[:-1])[0]
+    ap = np.sum((mrec[changes + 1] - mrec[changes]) * mpre[changes + 1])
+    return ap, precision, recall
+
+
+def evaluate(detections, groundtruths, iou_threshold=0.5, classes=None):
+    '''
+    Computes the AP of every class and the mAP.
+
+    Arguments:
+        detections (BoxSet): boxes of the detections (or of the tracker).
+        groundtruths (BoxSet): ground truth boxes.
+        iou_threshold (float): minimum IoU of a true positive.
+        classes (list, optional): classes to evaluate. Defaults to the classes of the ground truth.
+
+    Returns:
+        A dict with the `ap`, `tp`, `fp` and `positives` of each class and the `mAP`
+        (mean over the classes with ground truth).
+    '''
+    if classes is None:
+        classes = sorted(set(groundtruths.labels.tolist()))
+    results = OrderedDict()
+    for label in classes:
+        det = detections.labels == label
+        gt = groundtruths.labels == label
+        tp = match_detections(detections.frames[det], detections.scores[det], detections.boxes[det],
+                              groundtruths.frames[gt], groundtruths.boxes[gt], iou_threshold)
+        n_positives = int(np.count_nonzero(gt))
+        ap, _, _ = average_precision(tp, n_positives)
+        results[label] = {'ap': float(ap), 'tp': int(np.count_nonzero(tp)), 'fp': int(np.count_nonzero(~tp)),
+                          'positives': n_positives}
+    aps = [result['ap'] for result in results.values() if result['positives']]
+    return {'classes': results, 'mAP': float(np.mean(aps)) if aps else 0.0}
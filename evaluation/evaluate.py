@@ -0,0 +1,41 @@
+#
+# Created on Oct, 2026
+#
+# Evaluates the logs of the application against a MOT ground truth, in memory
+# (no per-frame text files).
+#
+# Usage: python2 -m evaluation.evaluate <gt.txt> log_network.log [log_tracking.log ...] [--iou 0.5]
+#
+
+import argparse
+import time
+
+from evaluation.average_precision import evaluate
+from evaluation.loaders import load_log, load_mot_gt
+
+
+def print_results(name, results):
+    ''' Prints the AP of every class and the mAP. '''
+    print('\n%s' % name)
+    print('%-12s%10s%10s%10s%10s' % ('class', 'AP', 'TP', 'FP', 'GT'))
+    for label, result in results['classes'].items():
+        print('%-12s%10.4f%10d%10d%10d' % (label, result['ap'], result['tp'], result['fp'], result['positives']))
+    print('%-12s%10.4f' % ('mAP', results['mAP']))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Per-class AP and mAP of the result logs.')
+    parser.add_argument('groundtruth', help='MOT ground truth file (gt.txt)')
+    parser.add_argument('logs', nargs='+', help='result logs (.log or .yaml)')
+    parser.add_argument('--iou', type=float, default=0.5, help='minimum IoU of a true positive')
+    args = parser.parse_args()
+
+    start_time = time.time()
+    groundtruths = load_mot_gt(args.groundtruth)
+    for path in args.logs:
+        print_results(path, evaluate(load_log(path), groundtruths, args.iou))
+    print('\nEvaluated in %.2f s.' % (time.time() - start_time))
+
+
+if __name__ == '__main__':
+    main()
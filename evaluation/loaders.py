@@ -0,0 +1,107 @@
+#
+# Created on Oct, 2026
+#
+# Loading of the result logs and of the MOT ground truth straight into arrays.
+# Frames are 0-based everywhere (as in the logs of the application).
+#
+
+from collections import namedtuple
+
+import numpy as np
+import yaml
+
+from Logger.converter import readLog
+
+try:
+    from yaml import CSafeLoader as SafeLoader
+except ImportError:  # libyaml not installed
+    from yaml import SafeLoader
+
+# coco equivalences for MOT label classes, the other classes are supposed to be person
+MOT_CLASSES = {1: 'person', 2: 'car', 3: 'car', 4: 'bicycle', 5: 'motorbike', 6: 'bicycle', 7: 'person'}
+
+# boxes in corners format: (xmin, ymin, xmax, ymax). Ids are -1 when unknown.
+BoxSet = namedtuple('BoxSet', ['frames', 'labels', 'scores', 'boxes', 'ids'])
+
+
+def read_yaml_entries(path):
+    '''
+    Yields the entries of a YAML log (a block sequence written by yaml.safe_dump) one by one:
+    every top-level item is parsed on its own, so the log is never fully loaded in memory.
+    '''
+    with open(path, 'r') as stream:
+        chunk = []
+        for line in stream:
+            if line.startswith('- ') and chunk:
+                yield yaml.load(''.join(chunk), Loader=SafeLoader)[0]
+                chunk = []
+            if line.startswith('---') or line.startswith('...'):  # document markers ('--- []' if empty)
+                continue
+            chunk.append(line)
+        if chunk:
+            yield yaml.load(''.join(chunk), Loader=SafeLoader)[0]
+
+
+def read_entries(path):
+    '''
+    Yields the entries of a result log one by one, from the line format (`.log`)
+    or from the YAML layout (`.yaml`).
+    '''
+    if path.endswith('.yaml') or path.endswith('.yml'):
+        return read_yaml_entries(path)
+    return readLog(path)
+
+
+def load_log(path, require_ids=False):
+    '''
+    Loads the results logged by the network or the tracker.
+
+    Arguments:
+        path (str): `log_*.log` or `log_*.yaml` file.
+        require_ids (bool, optional): every box must have a track id (tracking metrics).
+
+    Returns:
+        A `BoxSet` with one row per box (id -1 for the boxes without track id).
+        The empty frames are skipped.
+
+    Raises:
+        ValueError: if `require_ids` is set and a box has no track id.
+    '''
+    frames, labels, scores, boxes, ids = [], [], [], [], []
+    for entry in read_entries(path):
+        if len(entry) < 5:  # frame without results
+            continue
+        frames.append(int(entry[0]))
+        labels.append(entry[1])
+        scores.append(float(entry[2]))
+        boxes.append((entry[3][0], entry[3][1], entry[4][0], entry[4][1]))
+        ids.append(int(entry[5]) if len(entry) > 5 else -1)
+        if require_ids and ids[-1] == -1:
+            raise ValueError('%s: box without track id in frame %d (a network log cannot be evaluated '
+                             'as tracks).' % (path, frames[-1]))
+    return BoxSet(np.array(frames, dtype=np.int64),
+                  np.array(labels, dtype=str),
+                  np.array(scores, dtype=np.float64),
+                  np.array(boxes, dtype=np.float64).reshape(-1, 4),
+                  np.array(ids, dtype=np.int64))
+
+
+def load_mot_gt(path, classes=MOT_CLASSES):
+    '''
+    Loads a MOT ground truth file.
+
+    Arguments:
+        path (str): `gt.txt` file with rows `<frame>, <id>, <bb_left>, <bb_top>, <bb_width>,
+            <bb_height>, <conf>, <object_type>, <vis_ratio>`.
+        classes (dict): class names of the MOT object types.
+
+    Returns:
+        A `BoxSet` of the considered entries (the confidence acts like a flag: entries
+        with 0 are ignored), with 0-based frames and scores set to 1.
+    '''
+    gt = np.loadtxt(path, delimiter=',', ndmin=2)
+    gt = gt[gt[:, 6] != 0]
+    object_types = gt[:, 7].astype(np.int64)
+    labels = np.array([classes.get(object_type, 'person') for object_type in object_types], dtype=str)
+    boxes = np.stack([gt[:, 2], gt[:, 3], gt[:, 2] + gt[:, 4], gt[:, 3] + gt[:, 5]], axis=1)
+    return BoxSet(gt[:, 0].astype(np.int64) - 1, labels, np.ones(len(gt)), boxes, gt[:, 1].astype(np.int64))
@@ -0,0 +1,86 @@
+#
+# Created on Oct, 2026
+#
+# Streaming writers of the PascalVOC-style files (one text file per frame) used by
+# the external metrics tool: https://github.com/rafaelpadilla/Object-Detection-Metrics
+# Rows are grouped by frame in a bounded buffer, so the inputs are read in a
+# single pass with constant memory and every output file is opened once per flush.
+#
+
+import os
+
+from evaluation.loaders import MOT_CLASSES, read_entries
+
+
+class FrameFiles:
+
+    def __init__(self, folder, max_rows=100000):
+        ''' FrameFiles class appends rows to <folder>/<frame>.txt, keeping up to max_rows in memory. '''
+        self.folder = folder
+        self.max_rows = max_rows
+        self.rows = {}  # frame -> pending lines
+        self.pending = 0
+        self.frames_written = set()
+
+    def add(self, frame, line=None):
+        ''' Adds a line to the file of a frame (only creates the file if there is no line). '''
+        lines = self.rows.setdefault(frame, [])
+        if line is not None:
+            lines.append(line)
+            self.pending += 1
+            if self.pending >= self.max_rows:
+                self.flush()
+
+    def flush(self):
+        ''' Appends the pending lines, opening each file once. '''
+        for frame in sorted(self.rows):
+            with open(os.path.join(self.folder, '%d.txt' % frame), 'a') as logfile:
+                logfile.write(''.join(self.rows[frame]))
+            self.frames_written.add(frame)
+        self.rows = {}
+        self.pending = 0
+
+    def close(self, fill_gaps=False):
+        ''' Writes the pending lines. Creates the empty files of the missing frames if asked. '''
+        self.flush()
+        if fill_gaps and self.frames_written:
+            for frame in range(max(self.frames_written)):
+                if frame not in self.frames_written:
+                    open(os.path.join(self.folder, '%d.txt' % frame), 'a').close()
+
+
+def format_number(value):
+    ''' Formats a coordinate without decimals if it is an integer. '''
+    value = float(value)
+    return str(int(value)) if value.is_integer() else repr(value)
+
+
+def convert_log(path, frame_files):
+    '''
+    Writes the entries of a log as <class_name> <confidence> <left> <top> <right> <bottom>.
+    Frames without results get an empty file.
+    '''
+    for entry in read_entries(path):
+        if len(entry) > 1:  # this was not an empty frame in terms of detections
+            frame_files.add(int(entry[0]), '%s %s %s %s %s %s\n' % (
+                entry[1], entry[2], format_number(entry[3][0]), format_number(entry[3][1]),
+                format_number(entry[4][0]), format_number(entry[4][1])))
+        else:
+            frame_files.add(int(entry[0]))
+
+
+def convert_mot_gt(path, frame_files, classes=MOT_CLASSES):
+    '''
+    Writes the MOT ground truth as <class_name> <left> <top> <right> <bottom>, with 0-based
+    frames. Entries with confidence 0 are ignored, unknown classes are supposed to be person.
+    '''
+    with open(path, 'r') as stream:
+        for line in stream:  # <frame>, <id>, <bb_left>, <bb_top>, <bb_width>, <bb_height>, <conf>, <object_type>, <vis_ratio>
+            fields = line.strip().split(',')
+            if len(fields) < 8 or fields[6].strip() == '0':  # confidence acts like a flag
+                continue
+            label = classes.get(int(float(fields[7])), 'person')
+            left, top, width, height = [float(value) for value in fields[2:6]]
+            frame_files.add(int(fields[0]) - 1, '%s %s %s %s %s\n' % (
+                label, format_number(left), format_number(top),
+                format_number(left + width), format_number(top + height)))
@@ -0,0 +1,228 @@
+#
+# Created on Oct, 2026
+#
+# Tracking metrics of the logs of the tracker (with track ids) against the MOT
+# ground truth (with object ids): CLEAR-MOT (MOTA, MOTP, ID switches) and the
+# identity metrics (IDF1, IDP, IDR). Sequences are evaluated in parallel.
+#
+# Usage: python2 -m evaluation.tracking_metrics --sequence <gt.txt> <log_tracking.log> [--sequence ...]
+#
+
+import argparse
+import time
+from collections import OrderedDict
+from multiprocessing import Pool
+
+import numpy as np
+
+from Net.Keras.bounding_box_utils.bounding_box_utils import iou
+from Tracker.association import hungarian
+from evaluation.average_precision import frame_pairs
+from evaluation.loaders import load_log, load_mot_gt
+
+COUNTS = ('frames', 'gt', 'hyp', 'matches', 'fp', 'fn', 'idsw', 'overlap', 'idtp', 'gt_ids', 'mt', 'ml')
+
+
+def select(boxset, mask):
+    ''' Returns the rows of a BoxSet selected by a mask. '''
+    return boxset._replace(**dict((field, getattr(boxset, field)[mask]) for field in boxset._fields))
+
+
+def sort_by_frame(boxset):
+    ''' Returns the BoxSet sorted by frame (stable). '''
+    return select(boxset, np.argsort(boxset.frames, kind='mergesort'))
+
+
+def pair_overlaps(gt, hyp):
+    '''
+    Computes the IoU of every (ground truth, hypothesis) pair of the same frame (sparse).
+
+    Arguments:
+        gt, hyp (BoxSet): boxes sorted by frame.
+
+    Returns:
+        The arrays of ground truth indices, hypothesis indices and IoU of the pairs.
+    '''
+    hyp_index, gt_index = frame_pairs(hyp.frames, gt.frames)
+    if not len(hyp_index):
+        return gt_index, hyp_index, np.zeros(0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        overlaps = np.nan_to_num(iou(gt.boxes[gt_index], hyp.boxes[hyp_index], coords='corners'))
+    return gt_index, hyp_index, overlaps
+
+
+def clear_mot(gt, hyp, gt_index, hyp_index, overlaps, iou_threshold):
+    '''
+    Matches the ground truth and the hypotheses frame by frame (CLEAR-MOT). The matches of
+    the previous frames are kept while their IoU reaches the threshold, the remaining
+    objects are assigned minimizing 1 - IoU on the sparse cost matrix of the frame.
+
+    Returns:
+        A dict with the counts of the CLEAR-MOT metrics and the matched frames of every object.
+    '''
+    counts = dict((name, 0) for name in COUNTS)
+    valid = overlaps >= iou_threshold
+    gt_index, hyp_index, overlaps = gt_index[valid], hyp_index[valid], overlaps[valid]
+    # candidate pairs grouped by frame
+    pair_frames = gt.frames[gt_index]
+    frames = np.union1d(gt.frames, hyp.frames)
+    pair_starts = np.searchsorted(pair_frames, frames, side='left')
+    pair_ends = np.searchsorted(pair_frames, frames, side='right')
+    gt_per_frame = np.bincount(np.searchsorted(frames, gt.frames), minlength=len(frames))
+    hyp_per_frame = np.bincount(np.searchsorted(frames, hyp.frames), minlength=len(frames))
+
+    last_match = {}  # gt id -> hyp id of its last match
+    matched_frames = {}  # gt id -> number of frames matched
+    for f in range(len(frames)):
+        pairs = slice(pair_starts[f], pair_ends[f])
+        g_ids = gt.ids[gt_index[pairs]]
+        h_ids = hyp.ids[hyp_index[pairs]]
+        pair_overlap = overlaps[pairs]
+        matches = []
+        if len(g_ids):
+            # keep the previous correspondences
+            kept = np.zeros(len(g_ids), dtype=bool)
+            for k, (g, h) in enumerate(zip(g_ids, h_ids)):
+                if last_match.get(g) == h and h not in h_ids[kept]:
+                    kept[k] = True
+                    matches.append((g, h, pair_overlap[k], False))
+            free = ~(np.isin(g_ids, g_ids[kept]) | np.isin(h_ids, h_ids[kept]))
+            if free.any():
+                rows, row_ids = np.unique(g_ids[free], return_inverse=True)
+                cols, col_ids = np.unique(h_ids[free], return_inverse=True)
+                cost = np.full((len(rows), len(cols)), 2.0)  # pairs below the threshold can't be matched
+                cost[row_ids, col_ids] = 1 - pair_overlap[free]
+                for r, c in zip(*hungarian(cost)):
+                    if cost[r, c] <= 1:
+                        switch = rows[r] in last_match and last_match[rows[r]] != cols[c]
+                        matches.append((rows[r], cols[c], 1 - cost[r, c], switch))
+        for g, h, overlap, switch in matches:
+            last_match[g] = h
+            matched_frames[g] = matched_frames.get(g, 0) + 1
+            counts['overlap'] += overlap
+            counts['idsw'] += int(switch)
+        counts['matches'] += len(matches)
+        counts['fn'] += gt_per_frame[f] - len(matches)
+        counts['fp'] += hyp_per_frame[f] - len(matches)
+    counts['frames'] = len(frames)
+    counts['gt'] = len(gt.frames)
+    counts['hyp'] = len(hyp.frames)
+    return counts, matched_frames
+
+
+def identity_true_positives(gt, hyp, gt_index, hyp_index, overlaps, iou_threshold):
+    '''
+    Computes the IDTP: the trajectories of the ground truth and of the hypotheses are
+    matched one to one maximizing the number of frames where they overlap.
+    '''
+    valid = overlaps >= iou_threshold
+    if not valid.any():
+        return 0
+    gt_ids, rows = np.unique(gt.ids[gt_index[valid]], return_inverse=True)
+    hyp_ids, cols = np.unique(hyp.ids[hyp_index[valid]], return_inverse=True)
+    cooccurrence = np.bincount(rows * len(hyp_ids) + cols,
+                               minlength=len(gt_ids) * len(hyp_ids)).reshape(len(gt_ids), len(hyp_ids))
+    rows, cols = hungarian(-cooccurrence)
+    return int(cooccurrence[rows, cols].sum())
+
+
+def evaluate_sequence(gt, hyp, iou_threshold=0.5, label='person'):
+    '''
+    Computes the tracking metrics of one sequence.
+
+    Arguments:
+        gt (BoxSet): ground truth boxes with object ids.
+        hyp (BoxSet): boxes of the tracker with track ids.
+        iou_threshold (float): minimum IoU of a match.
+        label (str, optional): class to evaluate (None for every class).
+
+    Returns:
+        A dict with the counts of the sequence.
+    '''
+    if label is not None:
+        gt = select(gt, gt.labels == label)
+        hyp = select(hyp, hyp.labels == label)
+    gt, hyp = sort_by_frame(gt), sort_by_frame(hyp)
+    gt_index, hyp_index, overlaps = pair_overlaps(gt, hyp)
+    counts, matched_frames = clear_mot(gt, hyp, gt_index, hyp_index, overlaps, iou_threshold)
+    counts['idtp'] = identity_true_positives(gt, hyp, gt_index, hyp_index, overlaps, iou_threshold)
+    # mostly tracked / lost: objects matched in at least 80% / at most 20% of their frames
+    ids, lengths = np.unique(gt.ids, return_counts=True)
+    ratios = np.array([matched_frames.get(i, 0) for i in ids], dtype=np.float64) / np.maximum(lengths, 1)
+    counts['gt_ids'] = len(ids)
+    counts['mt'] = int(np.count_nonzero(ratios >= 0.8))
+    counts['ml'] = int(np.count_nonzero(ratios <= 0.2))
+    return counts
+
+
+def compute_metrics(counts):
+    ''' Returns the metrics of the accumulated counts. '''
+    metrics = OrderedDict()
+    gt, hyp, matches = float(counts['gt']), float(counts['hyp']), float(counts['matches'])
+    metrics['MOTA'] = 1 - (counts['fn'] + counts['fp'] + counts['idsw']) / gt if gt else 0.0
+    metrics['MOTP'] = counts['overlap'] / matches if matches else 0.0  # mean IoU of the matches
+    idtp = float(counts['idtp'])
+    metrics['IDF1'] = 2 * idtp / (gt + hyp) if gt + hyp else 0.0
+    metrics['IDP'] = idtp / hyp if hyp else 0.0
+    metrics['IDR'] = idtp / gt if gt else 0.0
+    for name in ('idsw', 'fp', 'fn', 'mt', 'ml', 'gt_ids', 'frames'):
+        metrics[name.upper()] = int(counts[name])
+    return metrics
+
+
+def evaluate_files(args):
+    ''' Loads and evaluates one sequence (runs in a worker process). '''
+    gt_path, log_path, iou_threshold, label = args
+    return evaluate_sequence(load_mot_gt(gt_path), load_log(log_path, require_ids=True), iou_threshold, label)
+
+
+def evaluate_sequences(sequences, iou_threshold=0.5, label='person', processes=None):
+    '''
+    Evaluates several sequences in parallel.
+
+    Arguments:
+        sequences (list): (gt path, log path) of every sequence.
+        iou_threshold (float): minimum IoU of a match.
+        label (str, optional): class to evaluate (None for every class).
+        processes (int, optional): worker processes (defaults to the number of CPUs).
+
+    Returns:
+        The metrics of every sequence and of all of them (counts summed).
+    '''
+    jobs = [(gt_path, log_path, iou_threshold, label) for gt_path, log_path in sequences]
+    if len(jobs) > 1 and processes != 1:
+        pool = Pool(processes)
+        try:
+            results = pool.map(evaluate_files, jobs)
+        finally:
+            pool.close()
+            pool.join()
+    else:
+        results = [evaluate_files(job) for job in jobs]
+    total = dict((name, sum(counts[name] for counts in results)) for name in COUNTS)
+    return [compute_metrics(counts) for counts in results], compute_metrics(total)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='CLEAR-MOT and identity metrics of the tracking logs.')
+    parser.add_argument('--sequence', nargs=2, action='append', required=True, metavar=('GT', 'LOG'),
+                        help='MOT ground truth (gt.txt) and tracking log (.log or .yaml) of a sequence')
+    parser.add_argument('--iou', type=float, default=0.5, help='minimum IoU of a match')
+    parser.add_argument('--label', default='person', help='class to evaluate ("all" for every class)')
+    parser.add_argument('--processes', type=int, default=None, help='worker processes (default: number of CPUs)')
+    args = parser.parse_args()
+
+    start_time = time.time()
+    label = None if args.label == 'all' else args.label
+    per_sequence, overall = evaluate_sequences(args.sequence, args.iou, label, args.processes)
+    names = list(overall.keys())
+    print('%-24s' % 'sequence' + ''.join('%8s' % name for name in names))
+    rows = [(log_path, metrics) for (_, log_path), metrics in zip(args.sequence, per_sequence)]
+    for name, metrics in rows + [('OVERALL', overall)]:
+        print('%-24s' % name[-24:] + ''.join(('%8.3f' if isinstance(metrics[key], float) else '%8d') % metrics[key]
+                                            for key in names))
+    print('\nEvaluated in %.2f s.' % (time.time() - start_time))
+
+
+if __name__ == '__main__':
+    main()
@@ -1,2 +1,2 @@
-python2 convert_gt_to_pascalvoc.py
+python2 convert_gt_to_pascalvoc.py "$@"  # path to gt.txt, e.g. MOT17Det/train/MOT17-13/gt/gt.txt
 #mv gt.txt ../
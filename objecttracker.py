@@ -19,17 +19,42 @@
 # https://github.com/JdeRobot/dl-objectdetector/blob/master/objectdetector.py
 
 import sys
+import atexit
 import signal
 import yaml
 
 from Camera.threadcamera import ThreadCamera
-from GUI.gui import GUI
-from GUI.threadgui import ThreadGUI
+from Logger.resultlogger import ResultLogger
 from Net.threadnetwork import ThreadNetwork
+from Pipeline import imports, instrumentation, tracing
+from Pipeline.pipeline import Pipeline
 from Tracker.tracker import Tracker
 from Tracker.threadtracker import ThreadTracker
 
-signal.signal(signal.SIGINT, signal.SIG_DFL)
+
+def interrupt(*args):
+    """
+    Exits on ctrl+c through sys.exit, so the exit handlers still run (logs, output sink, reports, trace).
+    The handler runs in the main thread: in the loop of the headless GUI, offline, or in a Qt timer slot
+    (PyQt exits the application on SystemExit).
+    """
+    sys.exit(130)
+
+
+signal.signal(signal.SIGINT, interrupt)
+
+
+def printInstrumentation(*args):
+    """
+    Prints the latency percentiles (ms) and the throughput (per second) of every stage.
+    """
+    print('\n' + instrumentation.report())
+    sys.stdout.flush()
+
+
+atexit.register(printInstrumentation)  # at shutdown
+if hasattr(signal, 'SIGUSR1'):
+    signal.signal(signal.SIGUSR1, printInstrumentation)  # on demand: kill -USR1 <pid>
 
 
 def selectVideoSource(cfg, gui_cfg):
@@ -72,10 +97,10 @@ def selectNetwork(cfg):
     image_net_size = net_prop['InputSize']
     confidence = net_prop['Confidence']
     if framework.lower() == 'tensorflow':
-        from Net.TensorFlow.network import DetectionNetwork
+        DetectionNetwork = imports.load('Net.TensorFlow.network').DetectionNetwork
     elif framework.lower() == 'keras':
         sys.path.append('Net/Keras')
-        from Net.Keras.network import DetectionNetwork
+        DetectionNetwork = imports.load('Net.Keras.network').DetectionNetwork
     else:
         raise SystemExit('%s not supported! Supported frameworks: Keras, TensorFlow' % framework)
     return net_prop, image_net_size, confidence, DetectionNetwork
@@ -105,6 +130,161 @@ def readLoggerStatus(cfg):
     return logger_status
 
 
+def createResultLoggers(cfg, network, tracker):
+    """
+    Streams the results of the network and the tracker to log_network.log and log_tracking.log.
+    @param cfg: configuration
+    """
+    logger_prop = cfg['ObjectTracker']['Logger']
+    flush_interval = logger_prop.get('FlushInterval', 1.0)
+    yaml_output = logger_prop.get('Yaml', True)  # compatibility with the metrics utilities
+    network.setResultLogger(ResultLogger('log_network.log', 'log_network.yaml' if yaml_output else None,
+                                         'fps_network.yaml', 3, flush_interval))
+    tracker.setResultLogger(ResultLogger('log_tracking.log', 'log_tracking.yaml' if yaml_output else None,
+                                         'fps_tracking.yaml', 2, flush_interval))
+
+
+def startTracing(cfg):
+    """
+    Records a timeline of the pipeline if enabled (Chrome trace JSON).
+    @param cfg: configuration
+    """
+    tracing_prop = cfg['ObjectTracker'].get('Tracing', {})
+    if tracing_prop.get('Status', False):
+        tracing.enable(tracing_prop.get('Path', 'trace.json'))
+        atexit.register(tracing.close)
+
+
+def readPipelineConfig(cfg):
+    """
+    @param cfg: configuration
+    @return buffer_size: maximum number of frames waiting for the tracker
+    """
+    pipeline_prop = cfg['ObjectTracker'].get('Pipeline', {})
+    buffer_size = pipeline_prop.get('BufferSize', 100)
+    print('Pipeline buffer size: %d frames.' % buffer_size)
+    return buffer_size
+
+
+def readDecoderConfig(cfg):
+    """
+    @param cfg: configuration
+    @return prefetch, ring_size, policy: decoder thread settings
+    """
+    decoder_prop = cfg['ObjectTracker'].get('Decoder', {})
+    prefetch = decoder_prop.get('Prefetch', False)
+    ring_size = decoder_prop.get('RingSize', 32)
+    policy = decoder_prop.get('Overflow', 'block').lower()
+    return prefetch, ring_size, policy
+
+
+def createScheduler(cfg):
+    """
+    Gates the detections with the changes of the scene if enabled.
+    @param cfg: configuration
+    @return scheduler: motion scheduler (None if disabled)
+    """
+    scheduler_prop = cfg['ObjectTracker'].get('Scheduler', {})
+    if not scheduler_prop.get('Status', False):
+        return None
+    from Pipeline.scheduler import MotionScheduler
+    scheduler = MotionScheduler(scheduler_prop.get('Threshold', 0.02), scheduler_prop.get('PixelThreshold', 25),
+                                scheduler_prop.get('Width', 64), scheduler_prop.get('MinInterval', 2),
+                                scheduler_prop.get('MaxInterval', 100), scheduler_prop.get('LostRatio', 0.5))
+    print('Motion-gated detections: %.1f%% of the scene must change (at most %d frames between detections).' % (
+        scheduler.threshold * 100, scheduler.max_interval))
+    return scheduler
+
+
+def createRoiDetector(cfg, network, image_net_size):
+    """
+    Detects the keyframes around the tracked objects at the resolution of the source if enabled.
+    @param cfg: configuration
+    @return roi: ROI detector (None if disabled)
+    """
+    roi_prop = cfg['ObjectTracker'].get('Roi', {})
+    if not roi_prop.get('Status', False):
+        return None
+    from Pipeline.roi import RoiDetector
+    roi = RoiDetector(network, image_net_size, roi_prop.get('Margin', 0.5), roi_prop.get('MinSize', 128),
+                      roi_prop.get('MaxRegions', 8), roi_prop.get('FullInterval', 5), roi_prop.get('IoUThreshold', 0.5))
+    print('ROI detection: %d regions at most, full frame every %d keyframes.' % (roi.max_regions, roi.full_interval))
+    return roi
+
+
+def createTiledDetector(cfg, network, image_net_size):
+    """
+    Detects the keyframes in overlapping tiles at the resolution of the source if enabled.
+    @param cfg: configuration
+    @return tiler: tiled detector (None if disabled)
+    @raise SystemExit in case of invalid overlap
+    """
+    tiles_prop = cfg['ObjectTracker'].get('Tiles', {})
+    if not tiles_prop.get('Status', False):
+        return None
+    from Pipeline.tiling import TiledDetector
+    tiler = TiledDetector(network, image_net_size, tiles_prop.get('TileSize', [600, 600]), tiles_prop.get('Overlap', 0.2),
+                          tiles_prop.get('MaxTiles', 16), tiles_prop.get('FullFrame', True),
+                          tiles_prop.get('IoUThreshold', 0.5))
+    print('Tiled detection: tiles of %dx%d px, %d%% overlap, %d tiles at most.' % (
+        tiler.tile_size[0], tiler.tile_size[1], tiler.overlap * 100, tiler.max_tiles))
+    return tiler
+
+
+def createOutputSink(cfg):
+    """
+    Writes the images with the results in background workers (GUI off).
+    @param cfg: configuration
+    @return sink: output sink
+    @raise SystemExit in case of unsupported sink
+    """
+    from Output.sinks import SINKS, JpegSink, VideoSink
+    output_prop = cfg['ObjectTracker'].get('Output', {})
+    sink_type = output_prop.get('Sink', 'jpeg').lower()
+    queue_size = output_prop.get('QueueSize', 64)
+    if sink_type == 'jpeg':
+        workers = output_prop.get('Workers', 2)
+        sink = JpegSink(output_prop.get('Path', 'images_results'), workers, queue_size, output_prop.get('Quality', 95))
+        print('Output: JPEG images in %s (%d workers).' % (sink.folder, workers))
+    elif sink_type == 'video':
+        sink = VideoSink(output_prop.get('Path', 'images_results'), output_prop.get('Fps', 25.0),
+                         output_prop.get('Codec', 'MJPG'), queue_size)
+        print('Output: video %s.' % sink.path)
+    else:
+        raise SystemExit('%s not supported! Supported output sinks: %s' % (sink_type, ', '.join(SINKS)))
+    atexit.register(sink.close)  # write the queued images before exiting
+    return sink
+
+
+def runOffline(cfg, cam, network, tracker, logger_status, image_net_size, confidence):
+    """
+    Processes a recorded source (video or images) as fast as possible and exits.
+    @param cfg: configuration
+    @raise SystemExit in case of live source
+    """
+    from Pipeline.offline import OfflineRunner
+    if cam.source not in ('local_video', 'local_images'):
+        raise SystemExit('Offline mode only supports recorded sources: Video, Images')
+    offline_prop = cfg['ObjectTracker'].get('Offline', {})
+    keyframe_interval = offline_prop.get('KeyframeInterval', 10)
+    batch_size = offline_prop.get('BatchSize', 1)
+    print('Offline mode: detection every %d frames, %d keyframes per batch.' % (keyframe_interval, batch_size))
+    cam.setLogger(logger_status)
+    if logger_status:
+        createResultLoggers(cfg, network, tracker)
+    cam.setNetwork(network, None)
+    cam.setTracker(tracker)
+    cam.setNetworkParams(image_net_size, confidence)
+    roi = createRoiDetector(cfg, network, image_net_size)
+    tiler = createTiledDetector(cfg, network, image_net_size)
+    prefetch, ring_size, _ = readDecoderConfig(cfg)
+    if prefetch and (roi is not None or tiler is not None):
+        print('Decoder disabled: ROI and tiled detection need the frames at the resolution of the source.')
+    elif prefetch:
+        cam.startDecoder(ring_size, 'block')  # never drop frames offline
+    OfflineRunner(cam, network, tracker, keyframe_interval, batch_size, createScheduler(cfg), roi, tiler).run()
+
+
 def readConfig():
     try:
         with open(sys.argv[1], 'r') as stream:
@@ -124,44 +304,81 @@ if __name__ == '__main__':
         gui_cfg = sys.argv[2]
     except IndexError:
         raise SystemExit('Missing GUI configuration. Usage: python2 objecttracker.py objecttracker.yml on')
+    if gui_cfg not in ('on', 'off', 'offline'):
+        raise SystemExit('%s not supported! Supported GUI configurations: on, off, offline' % gui_cfg)
 
     cfg = readConfig()
     cam = selectVideoSource(cfg, gui_cfg)
     net_prop, image_net_size, confidence, DetectionNetwork = selectNetwork(cfg)
     tracker_prop, tracker_lib_prop = selectTracker(cfg)
     logger_status = readLoggerStatus(cfg)
+    startTracing(cfg)
+
+    if gui_cfg == 'offline':
+        network, tracker = DetectionNetwork(net_prop), Tracker(tracker_prop, tracker_lib_prop)
+        print('\n' + imports.report() + '\n')
+        runOffline(cfg, cam, network, tracker, logger_status, image_net_size, confidence)
+        sys.exit(0)
+
+    buffer_size = readPipelineConfig(cfg)
+    pipeline = Pipeline(buffer_size)
+    pipeline.addStage('camera', cam.getQueueDepth)
+    pipeline.addStage('network')
+    pipeline.addStage('tracker')
+    pipeline.addStage('gui')
 
     network = DetectionNetwork(net_prop)
     # Threading Network
-    t_network = ThreadNetwork(network)
+    t_network = ThreadNetwork(network, pipeline)
     t_network.setDaemon(True)  # setting daemon thread to exit
     t_network.start()
+    pipeline.setQueueDepth('network', lambda: int(network.activated and network.input_image is not None))
 
     tracker = Tracker(tracker_prop, tracker_lib_prop)
     # Threading Tracker
-    t_tracker = ThreadTracker(tracker)
+    t_tracker = ThreadTracker(tracker, pipeline)
     t_tracker.setDaemon(True)
     t_tracker.start()
+    pipeline.setQueueDepth('tracker', tracker.getQueueDepth)
 
-    window = GUI()
+    if gui_cfg == 'on':
+        window = imports.load('GUI.gui').GUI(refresh_rate=cfg['ObjectTracker'].get('GUI', {}).get('RefreshRate'))
+    else:  # headless: Qt is never loaded
+        from GUI.headless import HeadlessGUI
+        window = HeadlessGUI()
+    window.setPipeline(pipeline)
+    cam.setPipeline(pipeline)
     cam.setGUI(window)
     cam.setLogger(logger_status)
+    if logger_status:
+        createResultLoggers(cfg, network, tracker)
     cam.setNetwork(network, t_network)
     cam.setTracker(tracker)
     cam.setNetworkParams(image_net_size, confidence)
+    scheduler = createScheduler(cfg)
+    if scheduler is not None:
+        cam.setScheduler(scheduler)
+        atexit.register(scheduler.printReport)
+    if gui_cfg == 'off':
+        sink = createOutputSink(cfg)
+        cam.setSink(sink)
+        pipeline.addStage('output', sink.queue.qsize)
+    prefetch, ring_size, policy = readDecoderConfig(cfg)
+    if prefetch:
+        cam.startDecoder(ring_size, policy)
+        pipeline.addStage('decoder', cam.ring.getOccupancy)
 
     # Threading camera
-    t_cam = ThreadCamera(cam)
+    t_cam = ThreadCamera(cam, pipeline)
     t_cam.setDaemon(True)
     t_cam.start()
     window.setNetwork(network, t_network)
     window.setTracker(tracker)
+    print('\n' + imports.report() + '\n')  # time spent loading the selected backends
 
     if gui_cfg == 'on':
         window.show()
-        # Threading GUI
-        t_gui = ThreadGUI(window)
-        t_gui.setDaemon(True)
-        t_gui.start()
+        pipeline.setQueueDepth('gui', window.display.getPending)  # refreshed by a timer of the Qt thread
+        sys.exit(window.app.exec_())
 
-    sys.exit(window.app.exec_())
\ No newline at end of file
+    sys.exit(window.exec_())  # returns when the source is exhausted
@@ -0,0 +1,78 @@
+#
+# Created on Oct, 2026
+#
+# Tests of the ROI and tiled detections: the boxes predicted in the crops of the
+# native frame must be mapped back to the pixels of the network images, and the
+# objects cut by a tile must not be detected twice.
+#
+
+import unittest
+
+import numpy as np
+
+from Net.utils import postprocessing
+from Pipeline.roi import RoiDetector
+from Pipeline.tiling import TiledDetector
+
+LABELS = np.array(['', 'person'], dtype=object)
+
+
+class KerasLikeNetwork:
+
+    def __init__(self, image_scale, model_size=300):
+        ''' Finds the white object of each image and predicts it in the pixels of a 300x300 model input,
+        then scales the boxes back like the Keras network. '''
+        self.image_scale = image_scale
+        self.model_size = model_size
+        self.label_table = LABELS
+
+    def detectBatch(self, images):
+        results = []
+        for im in images:
+            width_factor, height_factor = postprocessing.keras_scale_factors(im.shape, self.model_size,
+                                                                             self.model_size)
+            rows = []
+            ys, xs = np.nonzero(im[:, :, 0] > 127)
+            if len(xs):
+                rows.append([1, 0.9, xs.min() / width_factor, ys.min() / height_factor,
+                             (xs.max() + 1) / width_factor, (ys.max() + 1) / height_factor])
+            y_pred = np.array(rows, dtype=np.float64).reshape(-1, 6)
+            results.append(postprocessing.keras_detections(y_pred, 0.5, LABELS, width_factor, height_factor))
+        return results
+
+    def logDetections(self, frame_number, detection, fps_rate):
+        pass
+
+
+class NativeDetectionTest(unittest.TestCase):
+
+    def setUp(self):
+        # 1600x1200 source, 400x400 network images (scale 4 x 3), object at (800, 600)-(880, 720)
+        self.native = np.zeros((1200, 1600, 3), dtype=np.uint8)
+        self.native[600:720, 800:880] = 255
+        self.expected = np.array([800 / 4.0, 600 / 3.0, 880 / 4.0, 720 / 3.0])
+        self.network = KerasLikeNetwork((4.0, 3.0))
+
+    def assertBox(self, detection):
+        self.assertEqual(len(detection), 1)
+        np.testing.assert_allclose(detection.boxes[0], self.expected, atol=1.5)
+
+    def testRoi(self):
+        roi = RoiDetector(self.network, (400, 400), margin=0.5, min_size=128)
+        self.assertBox(roi.predict(self.native, [(195, 195, 225, 245)], 1))
+
+    def testTiles(self):
+        tiler = TiledDetector(self.network, (400, 400), tile_size=(600, 600), overlap=0.2, full_frame=False)
+        self.assertBox(tiler.predict(self.native, np.zeros((400, 400, 3), dtype=np.uint8), 1))
+
+    def testTileBorder(self):
+        # the first tile (0-600 px) cuts the object (580-640 px), the second one (333-933 px) sees it whole
+        self.native[:] = 0
+        self.native[100:220, 580:640] = 255
+        self.expected = np.array([580 / 4.0, 100 / 3.0, 640 / 4.0, 220 / 3.0])
+        tiler = TiledDetector(self.network, (400, 400), tile_size=(600, 600), overlap=0.2, full_frame=False)
+        self.assertBox(tiler.predict(self.native, np.zeros((400, 400, 3), dtype=np.uint8), 1))
+
+
+if __name__ == '__main__':
+    unittest.main()
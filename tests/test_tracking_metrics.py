@@ -0,0 +1,56 @@
+#
+# Created on Oct, 2026
+#
+# Tests of the loading of the tracking logs for the CLEAR-MOT / identity metrics.
+#
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from Logger.converter import formatEntry
+from evaluation.loaders import load_log
+from evaluation.tracking_metrics import evaluate_files
+
+
+class TrackingLogTest(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.gt_path = os.path.join(self.folder, 'gt.txt')
+        with open(self.gt_path, 'w') as stream:
+            for frame in range(1, 6):
+                stream.write('%d,1,10,10,20,40,1,1,1\n' % frame)
+                stream.write('%d,2,100,10,20,40,1,1,1\n' % frame)
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def writeLog(self, with_ids):
+        ''' Writes the perfect tracks of the ground truth, with or without their ids. '''
+        path = os.path.join(self.folder, 'log_tracking.log')
+        with open(path, 'w') as stream:
+            for frame in range(5):
+                for track_id, xmin in ((1, 10), (2, 100)):
+                    entry = [frame, 'person', 0, (xmin, 10), (xmin + 20, 50)]
+                    if with_ids:
+                        entry.append(track_id)
+                    stream.write(formatEntry(entry))
+        return path
+
+    def testLogWithIds(self):
+        counts = evaluate_files((self.gt_path, self.writeLog(True), 0.5, 'person'))
+        self.assertEqual((counts['fp'], counts['fn'], counts['idsw']), (0, 0, 0))
+
+    def testLogWithoutIdsIsRejected(self):
+        path = self.writeLog(False)
+        self.assertEqual(len(load_log(path).ids), 10)  # still loaded for the detection metrics
+        with self.assertRaises(ValueError) as context:
+            load_log(path, require_ids=True)
+        self.assertIn(path, str(context.exception))
+        self.assertRaises(ValueError, evaluate_files, (self.gt_path, path, 0.5, 'person'))
+
+
+if __name__ == '__main__':
+    unittest.main()